@@ -0,0 +1,113 @@
+"""
+Measures how the toctree options affect the time ``sphinx-build`` spends
+writing HTML for a large, synthetic package.
+
+Usage::
+
+    python benchmarks/toctree_write_time.py [--subpackages N] [--modules M]
+
+Every variant is generated with :py:func:`sphinx_nested_apidoc.run` and built
+from scratch. The write time is measured from the end of the consistency
+check to the end of the build, which excludes reading the sources.
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sphinx.application import Sphinx
+from sphinx.util.docutils import docutils_namespace
+
+from sphinx_nested_apidoc import RunConfig, run
+from sphinx_nested_apidoc.toctree import ToctreeOptions
+
+VARIANTS = {
+    "relative": ToctreeOptions(),
+    "maxdepth=1": ToctreeOptions(maxdepth=1),
+    "max-entries=25": ToctreeOptions(max_entries=25),
+    "maxdepth=1,max-entries=25": ToctreeOptions(maxdepth=1, max_entries=25),
+    "glob": ToctreeOptions(glob=True),
+}
+
+INDEX = """\
+Benchmark
+=========
+
+.. toctree::
+
+   modules
+"""
+
+
+def make_package(root: Path, subpackages: int, modules: int) -> Path:
+    package = root / "benchpkg"
+    package.mkdir()
+    (package / "__init__.py").touch()
+    for i in range(subpackages):
+        subpackage = package / f"sub{i:03}"
+        subpackage.mkdir()
+        (subpackage / "__init__.py").touch()
+        for j in range(modules):
+            (subpackage / f"mod{j:03}.py").write_text(f"VALUE = {j}\n")
+    return package
+
+
+def build(package: Path, srcdir: Path, toctree: ToctreeOptions) -> float:
+    run(RunConfig(package_dir=package, output_dir=srcdir, toctree=toctree))
+    (srcdir / "conf.py").write_text(
+        'extensions = ["sphinx.ext.autodoc"]\nhtml_theme = "alabaster"\n'
+    )
+    (srcdir / "index.rst").write_text(INDEX)
+
+    marks: dict[str, float] = {}
+    # directives are registered globally, so each build gets a clean slate.
+    with docutils_namespace():
+        app = Sphinx(
+            str(srcdir),
+            str(srcdir),
+            str(srcdir / "_build"),
+            str(srcdir / "_build" / ".doctrees"),
+            "html",
+            status=None,
+            freshenv=True,
+        )
+        app.connect(
+            "env-check-consistency",
+            lambda *_: marks.setdefault("read", time.perf_counter()),
+        )
+        app.connect(
+            "build-finished",
+            lambda *_: marks.setdefault("write", time.perf_counter()),
+        )
+        app.build()
+    return marks["write"] - marks["read"]
+
+
+def main() -> None:
+    ps = argparse.ArgumentParser(description=__doc__)
+    ps.add_argument("--subpackages", type=int, default=20)
+    ps.add_argument("--modules", type=int, default=100)
+    args = ps.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        package = make_package(root, args.subpackages, args.modules)
+        sys.path.insert(0, str(root))
+        print(
+            f"{args.subpackages} subpackages x {args.modules} modules",
+            file=sys.stderr,
+        )
+        for name, toctree in VARIANTS.items():
+            srcdir = root / "docs"
+            write_time = build(package, srcdir, toctree)
+            print(f"{name:>28}: {write_time:7.2f}s")
+            shutil.rmtree(srcdir)
+
+
+if __name__ == "__main__":
+    main()
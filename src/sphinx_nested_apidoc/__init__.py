@@ -29,5 +29,6 @@ def start_logging(
 
 
 from ._ext import setup  # noqa: E402,TCH001
+from .api import RunConfig, RunResult, run  # noqa: E402
 
-__all__ = ["setup", "__version__"]
+__all__ = ["RunConfig", "RunResult", "run", "setup", "__version__"]
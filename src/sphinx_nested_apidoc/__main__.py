@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import enum
 import logging
 import typing
 from pathlib import Path
 
 from . import __version__, start_logging
-from .core import feed_sphinx_apidoc, rename_files, sanitize_path
+from .api import RunConfig, run
+from .toctree import ToctreeOptions
 
 logger = logging.getLogger(__name__)
 
@@ -91,20 +93,81 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Run the script without creating files",
     )
-    ps.add_argument(
+    output_group = ps.add_mutually_exclusive_group(required=True)
+    output_group.add_argument(
         "-o",
         "--output-dir",
         dest="destdir",
-        required=True,
         type=str,
         help="directory to place all output",
     )
+    output_group.add_argument(
+        "--output-archive",
+        type=str,
+        help="Stream the nested files into a tar or zip archive instead of"
+        " a directory. The format is chosen from the suffix, e.g. `.tar.gz`"
+        " or `.zip`. Cannot be used with sphinx-apidoc's `--full`.",
+    )
+    ps.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each file straight to its nested path as it is generated,"
+        " instead of renaming the flattened files afterwards. Memory use does"
+        " not grow with the number of modules. Cannot be used with"
+        " sphinx-apidoc's `--full`.",
+    )
+    ps.add_argument(
+        "--check",
+        action="store_true",
+        help="Do not write anything. Instead, list the files that would be"
+        " added, changed or orphaned in the output directory and exit with"
+        " status 1 if there are any.",
+    )
     ps.add_argument(
         "--package-name",
         type=str,
         help="Name of the directory to put the package documentation in."
         " By default it is the name of the package itself.",
     )
+    ps.add_argument(
+        "--remap",
+        action="store_true",
+        help="Remember the run in the output directory. If a later run of the"
+        " same package only changes --package-name, or the package directory"
+        " was renamed, move the previously generated directory instead of"
+        " generating it again.",
+    )
+
+    ps.add_argument(
+        "--template-cache-dir",
+        type=str,
+        help="Directory to keep the compiled sphinx-apidoc templates in, so"
+        " that later runs do not compile them again. By default, they are"
+        " only kept in memory.",
+    )
+
+    toctree_group = ps.add_argument_group(
+        "toctree options",
+        "Rewrite the toctrees of the generated pages to refer to the nested"
+        " pages. Any of these options enables the rewrite.",
+    )
+    toctree_group.add_argument(
+        "--toctree-maxdepth",
+        type=int,
+        help="Maximum depth of every toctree.",
+    )
+    toctree_group.add_argument(
+        "--toctree-max-entries",
+        type=int,
+        help="Split toctrees with more entries than this into child pages"
+        " listing at most this many entries each.",
+    )
+    toctree_group.add_argument(
+        "--toctree-glob",
+        action="store_true",
+        help="List the pages of each nested directory with `*` and"
+        " `*/index` glob patterns instead of by name.",
+    )
 
     # sphinx-apidoc specific options
     sphinx_group = ps.add_argument_group("sphinx-apidoc options")
@@ -136,40 +199,94 @@ def main(argv: list[str] | None = None) -> int:
         log_level = _count_to_loglevel[
             _clip(args.verbose, LoggingLevel.WARNING, LoggingLevel.DEBUG)
         ]
-    start_logging(log_level)
+    if args.output_archive is not None and args.check:
+        ps.error("--check cannot be used with --output-archive")
+    if (args.stream or args.output_archive is not None) and {
+        "-F",
+        "--full",
+    } & set(args.sphinx_commands):
+        ps.error(
+            "sphinx-apidoc's --full cannot be used with --stream or"
+            " --output-archive"
+        )
+
+    toctree = None
+    if (
+        args.toctree_maxdepth is not None
+        or args.toctree_max_entries is not None
+        or args.toctree_glob
+    ):
+        try:
+            toctree = ToctreeOptions(
+                maxdepth=args.toctree_maxdepth,
+                max_entries=args.toctree_max_entries,
+                glob=args.toctree_glob,
+            )
+        except ValueError as e:
+            ps.error(str(e))
 
-    is_help = feed_sphinx_apidoc(
-        args.destdir,
-        args.module_path,
-        *args.sphinx_commands,
+    config = RunConfig(
+        package_dir=Path(args.module_path),
+        output_dir=Path(args.destdir) if args.destdir is not None else None,
+        output_archive=(
+            Path(args.output_archive)
+            if args.output_archive is not None
+            else None
+        ),
+        package_name=(
+            Path(args.package_name) if args.package_name is not None else None
+        ),
+        suffix=args.suffix,
         implicit_namespaces=args.implicit_namespaces,
         force=args.force,
-        suffix=args.suffix,
+        dry_run=args.dry_run,
+        stream=args.stream,
+        check=args.check,
+        sphinx_arguments=args.sphinx_commands,
+        template_cache_dir=(
+            Path(args.template_cache_dir)
+            if args.template_cache_dir is not None
+            else None
+        ),
+        toctree=toctree,
+        remap=args.remap,
     )
 
-    if is_help:
-        ps.exit(0)
+    with _logging_enabled(log_level):
+        try:
+            result = run(config)
+        except ValueError as e:
+            logger.exception("%s", e)
+            return 1
 
-    try:
-        rename_files(
-            Path(args.destdir),
-            Path(args.module_path),
-            package_name=(
-                sanitize_path(Path(args.package_name))
-                if args.package_name is not None
-                else None
-            ),
-            extension=args.suffix,
-            implicit_namespaces=args.implicit_namespaces,
-            dry_run=args.dry_run,
-            force=args.force,
-        )
-    except ValueError as e:
-        logger.exception("%s", e)
-        return 1
+    if result.check is not None:
+        for status, files in (
+            ("added", result.check.added),
+            ("changed", result.check.changed),
+            ("orphaned", result.check.orphaned),
+        ):
+            for file in files:
+                print(f"{status}: {Path(args.destdir, file)}")
 
-    return 0
+    return 0 if result.ok else 1
+
+
+@contextlib.contextmanager
+def _logging_enabled(level: int) -> typing.Iterator[None]:
+    """
+    Enables logging for the duration of a single :py:func:`main` call, so
+    that calling it repeatedly in the same process does not stack up
+    handlers.
+    """
+    package_logger = logging.getLogger(__package__)
+    previous_level = package_logger.level
+    handler = start_logging(level)
+    try:
+        yield
+    finally:
+        package_logger.removeHandler(handler)
+        package_logger.setLevel(previous_level)
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -4,11 +4,14 @@ import types
 import typing
 from pathlib import Path
 
+from sphinx.errors import ExtensionError
+
 if typing.TYPE_CHECKING:
     from sphinx.application import Sphinx
 
 from . import __version__
-from .core import feed_sphinx_apidoc, rename_files, sanitize_path
+from .api import RunConfig, run
+from .toctree import ToctreeOptions
 
 
 def _execute(
@@ -19,28 +22,36 @@ def _execute(
     excluded_files: typing.Iterable[str],
     module_first: bool,
     implicit_namespaces: bool,
+    *,
+    toctree: ToctreeOptions | None = None,
+    remap: bool = False,
 ) -> None:
     extra_args = []
     if module_first:
         extra_args.append("--module-first")
 
-    feed_sphinx_apidoc(
-        str(doc_dir),
-        str(package_dir),
-        "--full",  # without `full` sphinx-build cannot find `index.rst`
-        *extra_args,
-        suffix=suffix,
-        implicit_namespaces=implicit_namespaces,
-    )
-
-    rename_files(
-        doc_dir,
-        package_dir,
-        (sanitize_path(package_name) if package_name is not None else None),
-        suffix,
-        implicit_namespaces=implicit_namespaces,
-        excluded_files=excluded_files,
+    result = run(
+        RunConfig(
+            package_dir=package_dir,
+            output_dir=doc_dir,
+            package_name=package_name,
+            suffix=suffix,
+            implicit_namespaces=implicit_namespaces,
+            excluded_files=tuple(excluded_files),
+            # without `full` sphinx-build cannot find `index.rst`
+            sphinx_arguments=("--full", *extra_args),
+            toctree=toctree,
+            remap=remap,
+        )
     )
+    if result.failed:
+        failed = ", ".join(str(source) for source, _ in result.failed)
+        msg = f"cannot place the generated pages: {failed}"
+        raise ExtensionError(
+            msg,
+            orig_exc=result.failed[0][1],
+            modname=__package__,
+        )
 
 
 def _builder_inited(app: Sphinx) -> None:
@@ -52,14 +63,33 @@ def _builder_inited(app: Sphinx) -> None:
     excluded_files: list[str] = config.sphinx_nested_apidoc_excluded_files
     module_first: bool = config.sphinx_nested_apidoc_module_first
     implicit_namespaces: bool = config.sphinx_nested_apidoc_implicit_namespaces
+    toctree_maxdepth: int | None = config.sphinx_nested_apidoc_toctree_maxdepth
+    toctree_max_entries: int | None = (
+        config.sphinx_nested_apidoc_toctree_max_entries
+    )
+    toctree_glob: bool = config.sphinx_nested_apidoc_toctree_glob
+    remap: bool = config.sphinx_nested_apidoc_remap
+    toctree = None
+    if (
+        toctree_maxdepth is not None
+        or toctree_max_entries is not None
+        or toctree_glob
+    ):
+        toctree = ToctreeOptions(
+            maxdepth=toctree_maxdepth,
+            max_entries=toctree_max_entries,
+            glob=toctree_glob,
+        )
     _execute(
         Path(package_dir),
         Path(docdir),
-        Path(package_name),
+        Path(package_name) if package_name is not None else None,
         suffix,
         excluded_files,
         module_first,
         implicit_namespaces,
+        toctree=toctree,
+        remap=remap,
     )
 
 
@@ -109,5 +139,36 @@ def setup(app: Sphinx) -> dict[str, str | bool]:
         "env",
         [bool],
     )
+    # rewrite the toctrees to refer to the nested pages and cap their
+    # `:maxdepth:`.
+    app.add_config_value(
+        "sphinx_nested_apidoc_toctree_maxdepth",
+        None,
+        "env",
+        [int, types.NoneType],
+    )
+    # split toctrees with more entries than this into paginated child pages.
+    app.add_config_value(
+        "sphinx_nested_apidoc_toctree_max_entries",
+        None,
+        "env",
+        [int, types.NoneType],
+    )
+    # list the pages of each nested directory with glob patterns.
+    app.add_config_value(
+        "sphinx_nested_apidoc_toctree_glob",
+        False,
+        "env",
+        [bool],
+    )
+
+    # remember each run and move the generated directory instead of
+    # regenerating it when only the package name changes.
+    app.add_config_value(
+        "sphinx_nested_apidoc_remap",
+        False,
+        "env",
+        [bool],
+    )
 
     return {"version": __version__, "parallel_read_safe": True}
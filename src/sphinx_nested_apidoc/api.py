@@ -0,0 +1,462 @@
+"""
+In-process API for generating the nested documentation.
+
+:py:func:`run` does everything the ``sphinx-nested-apidoc`` command does, but
+returns a structured :py:class:`RunResult` instead of an exit code and leaves
+the logging configuration alone, so it can be called repeatedly from another
+program. Both the command line interface and the Sphinx extension use it.
+
+Note:
+    ``sphinx-apidoc`` itself is not thread-safe, so concurrent calls to
+    :py:func:`run` from different threads are not supported.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import time
+import typing
+from pathlib import Path
+
+from .archive import write_archive
+from .core import (
+    CheckResult,
+    PlacementResult,
+    check_nested_files,
+    feed_sphinx_apidoc,
+    is_packagedir,
+    rename_files,
+    rewrite_nested_toctrees,
+    sanitize_path,
+    write_nested_files,
+)
+from .toctree import move_toctree_entries
+
+if typing.TYPE_CHECKING:
+    from typing import Sequence
+
+    from .toctree import ToctreeOptions
+
+logger = logging.getLogger(__name__)
+
+# sphinx-apidoc only generates the pages in dry run, so it cannot create the
+# files of `--full` when the pages are streamed.
+_FULL_FLAGS = frozenset(("-F", "--full"))
+
+#: Name of the file in the output directory that describes the previous run,
+#: when :py:attr:`RunConfig.remap` is set.
+METADATA_FILENAME = ".sphinx-nested-apidoc.json"
+
+# if any of these differ from the previous run, the pages must be regenerated.
+_REMAP_INVARIANTS = (
+    "fingerprint",
+    "suffix",
+    "implicit_namespaces",
+    "excluded_files",
+    "sphinx_arguments",
+    "toctree",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class RunConfig:
+    """Configuration of a single :py:func:`run`."""
+
+    #: Path to the package to document.
+    package_dir: Path
+    #: Directory to place all output in. Required unless ``output_archive``
+    #: is given.
+    output_dir: Path | None = None
+    #: Write the nested files into this tar or zip archive instead of
+    #: ``output_dir``.
+    output_archive: Path | None = None
+    #: Name of the directory to put the package documentation in. By default
+    #: it is the name of the package itself.
+    package_name: Path | None = None
+    #: File suffix of the generated files, without the leading ".".
+    suffix: str = "rst"
+    #: Interpret module paths according to PEP-0420 implicit namespaces
+    #: specification.
+    implicit_namespaces: bool = False
+    #: Replace existing files.
+    force: bool = False
+    #: Run without creating files.
+    dry_run: bool = False
+    #: Write each file straight to its nested path as it is generated. The
+    #: files of ``sphinx-apidoc --full`` cannot be generated this way.
+    stream: bool = False
+    #: Only compare the generated files with ``output_dir``, see
+    #: :py:func:`~sphinx_nested_apidoc.core.check_nested_files`.
+    check: bool = False
+    #: Name of files (**without extension**) that keep their flat name.
+    excluded_files: Sequence[str] = ("index", "modules")
+    #: Additional commands and flags to supply to ``sphinx-apidoc``.
+    sphinx_arguments: Sequence[str] = ()
+    #: Directory to keep the compiled templates in. By default, they are only
+    #: kept in memory.
+    template_cache_dir: Path | None = None
+    #: Rewrite the toctrees of the generated pages to refer to the nested
+    #: pages, with the given depth and size limits. By default, the pages are
+    #: left as ``sphinx-apidoc`` generates them.
+    toctree: ToctreeOptions | None = None
+    #: Remember each run in ``output_dir``, and move the directory generated
+    #: by the previous run to its new name if only the name changed, see
+    #: :py:func:`run`.
+    remap: bool = False
+
+
+@dataclasses.dataclass
+class RunResult(PlacementResult):
+    """The outcome of a :py:func:`run`."""
+
+    #: The differences found when :py:attr:`RunConfig.check` is set.
+    check: CheckResult | None = None
+    #: The ``(old, new)`` directories if the documentation of the previous run
+    #: was moved as a whole instead of being regenerated.
+    remapped: tuple[Path, Path] | None = None
+    #: Wall-clock seconds spent in each stage, keyed by ``generate``,
+    #: ``place`` and ``total``. When the files are placed as they are
+    #: generated, only ``total`` is recorded.
+    durations: dict[str, float] = dataclasses.field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """``True`` if no file failed and no drift was found."""
+        return not self.failed and not self.check
+
+
+def _package_fingerprint(package_dir: Path) -> str:
+    """
+    Hashes the layout of the package. ``sphinx-apidoc`` only looks at the
+    names of the modules, so their content is not considered.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for dirpath, dirnames, filenames in os.walk(package_dir):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+        relpath = Path(dirpath).relative_to(package_dir).as_posix()
+        for filename in sorted(filenames):
+            digest.update(f"{relpath}/{filename}\0".encode())
+    return digest.hexdigest()
+
+
+def _metadata(
+    config: RunConfig,
+    nested_root: Path,
+    fingerprint: str,
+) -> dict[str, typing.Any]:
+    return {
+        "nested_root": nested_root.as_posix(),
+        "package_dir": config.package_dir.resolve().as_posix(),
+        "fingerprint": fingerprint,
+        "suffix": config.suffix,
+        "implicit_namespaces": config.implicit_namespaces,
+        "excluded_files": list(config.excluded_files),
+        "sphinx_arguments": list(config.sphinx_arguments),
+        "toctree": (
+            dataclasses.asdict(config.toctree)
+            if config.toctree is not None
+            else None
+        ),
+    }
+
+
+def _load_metadata(output_dir: Path) -> dict[str, typing.Any] | None:
+    try:
+        with (output_dir / METADATA_FILENAME).open(encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return metadata if isinstance(metadata, dict) else None
+
+
+def _save_metadata(output_dir: Path, metadata: dict[str, typing.Any]) -> None:
+    # replaced atomically, so an interrupted run leaves the old file intact.
+    metadata_file = output_dir / METADATA_FILENAME
+    tmp_file = metadata_file.with_name(f"{METADATA_FILENAME}.tmp")
+    tmp_file.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    tmp_file.replace(metadata_file)
+
+
+def _remap(
+    output_dir: Path,
+    previous: dict[str, typing.Any] | None,
+    current: dict[str, typing.Any],
+) -> tuple[Path, Path] | None:
+    """
+    Moves the nested directory of the previous run to its new name, if the
+    only difference between the runs is the name of that directory, or if
+    the package directory of the previous run was renamed.
+
+    Returns:
+        The old and new directories if the directory is moved.
+    """
+    if previous is None or previous["nested_root"] == current["nested_root"]:
+        return None
+    if any(previous.get(key) != current[key] for key in _REMAP_INVARIANTS):
+        return None
+    # another package with the same layout may be documented in the same
+    # directory. Its documentation is not ours to move.
+    previous_package = previous.get("package_dir")
+    if not isinstance(previous_package, str) or (
+        previous_package != current["package_dir"]
+        and Path(previous_package).exists()
+    ):
+        return None
+
+    old_dir = output_dir / previous["nested_root"]
+    new_dir = output_dir / current["nested_root"]
+    if not old_dir.is_dir() or new_dir.exists():
+        return None
+
+    new_dir.parent.mkdir(parents=True, exist_ok=True)
+    old_dir.rename(new_dir)
+    logger.info("%s -> %s", old_dir, new_dir)
+    return old_dir, new_dir
+
+
+def _move_top_level_entries(
+    output_dir: Path,
+    config: RunConfig,
+    old_dir: Path,
+    new_dir: Path,
+) -> None:
+    """
+    Points the rewritten toctrees of the excluded pages at the top level,
+    and of their child pages, to the moved directory. The toctrees in the
+    moved directory are relative, so they are still up to date.
+    """
+    suffix = f"{os.extsep}{config.suffix}"
+    pages: list[Path] = []
+    for name in config.excluded_files:
+        pages.append(output_dir / f"{name}{suffix}")
+        pages.extend((output_dir / f"{name}-toc").glob(f"*{suffix}"))
+
+    for page in pages:
+        if not page.is_file():
+            continue
+        text = page.read_text(encoding="utf-8")
+        moved = move_toctree_entries(
+            text,
+            page.relative_to(output_dir),
+            old_dir.relative_to(output_dir),
+            new_dir.relative_to(output_dir),
+        )
+        if moved != text:
+            page.write_text(moved, encoding="utf-8")
+            logger.info("%s now refers to %s", page, new_dir)
+
+
+def run(config: RunConfig) -> RunResult:
+    """Generates the nested documentation as described by ``config``.
+
+    If :py:attr:`RunConfig.remap` is set and the documentation is written
+    to ``output_dir``, a small metadata file (:py:data:`METADATA_FILENAME`)
+    describing the run is stored there. If the next run of the same package
+    only changes ``package_name``, the previously generated directory is
+    moved with a single rename instead of being regenerated. If the package
+    directory itself was renamed, the directory is moved too, but every
+    page in it is then rewritten, since every page refers to the package by
+    name. Existing excluded files, like ``modules``, are only replaced with
+    :py:attr:`RunConfig.force`, as in any other run. If the toctrees are
+    rewritten, their entries are pointed to the moved directory instead.
+
+    Args:
+        config: What to document and where to put it.
+
+    Returns:
+        The moved, skipped, excluded and failed files and the time taken.
+
+    Raises:
+        ValueError:
+            If the configuration is invalid, for example if neither
+            ``output_dir`` nor ``output_archive`` is given, or if ``--full``
+            is passed to ``sphinx-apidoc`` with ``stream`` or
+            ``output_archive``.
+    """
+    start = time.perf_counter()
+    result = RunResult()
+    # the package may have changed since the previous run.
+    is_packagedir.cache_clear()
+
+    if (
+        config.stream or config.output_archive is not None
+    ) and not _FULL_FLAGS.isdisjoint(config.sphinx_arguments):
+        msg = (
+            "sphinx-apidoc --full cannot be used with stream or"
+            " output_archive, since its files are not generated then"
+        )
+        raise ValueError(msg)
+
+    package_name = (
+        sanitize_path(config.package_name)
+        if config.package_name is not None
+        else None
+    )
+
+    if config.output_archive is not None:
+        write_archive(
+            config.output_archive,
+            config.package_dir,
+            *config.sphinx_arguments,
+            dry_run=config.dry_run,
+            result=result,
+            package_name=package_name,
+            extension=config.suffix,
+            implicit_namespaces=config.implicit_namespaces,
+            excluded_files=config.excluded_files,
+            template_cache_dir=config.template_cache_dir,
+            toctree=config.toctree,
+        )
+    elif config.output_dir is None:
+        msg = "either output_dir or output_archive must be given"
+        raise ValueError(msg)
+    elif config.check:
+        result.check = check_nested_files(
+            config.output_dir,
+            config.package_dir,
+            *config.sphinx_arguments,
+            package_name=package_name,
+            extension=config.suffix,
+            implicit_namespaces=config.implicit_namespaces,
+            excluded_files=config.excluded_files,
+            template_cache_dir=config.template_cache_dir,
+            toctree=config.toctree,
+        )
+    else:
+        _write(
+            config,
+            config.output_dir,
+            package_name,
+            result=result,
+            start=start,
+        )
+
+    result.durations["total"] = time.perf_counter() - start
+    logger.debug(
+        "%d moved, %d skipped, %d excluded, %d failed in %.3fs",
+        len(result.moved),
+        len(result.skipped),
+        len(result.excluded),
+        len(result.failed),
+        result.durations["total"],
+    )
+    return result
+
+
+def _write(
+    config: RunConfig,
+    output_dir: Path,
+    package_name: Path | None,
+    *,
+    result: RunResult,
+    start: float,
+) -> None:
+    # the whole package is documented in a single directory only if the
+    # package directory is itself a package.
+    metadata = None
+    if (
+        config.remap
+        and not config.dry_run
+        and (is_packagedir(config.package_dir) or config.implicit_namespaces)
+    ):
+        metadata = _metadata(
+            config,
+            package_name or Path(config.package_dir.resolve().name),
+            _package_fingerprint(config.package_dir),
+        )
+        previous = _load_metadata(output_dir)
+        result.remapped = _remap(output_dir, previous, metadata)
+        if result.remapped is not None and config.toctree is not None:
+            _move_top_level_entries(output_dir, config, *result.remapped)
+        if (
+            result.remapped is not None
+            and previous is not None
+            and previous["package_dir"] == metadata["package_dir"]
+        ):
+            # the pages do not mention the directory they are in, so they
+            # are still up to date.
+            _save_metadata(output_dir, metadata)
+            return
+
+    # after a package rename, every moved page mentions the old name, so all
+    # of them are rewritten in place.
+    force = config.force or result.remapped is not None
+    if config.stream:
+        write_nested_files(
+            output_dir,
+            config.package_dir,
+            *config.sphinx_arguments,
+            dry_run=config.dry_run,
+            force=force,
+            result=result,
+            package_name=package_name,
+            extension=config.suffix,
+            implicit_namespaces=config.implicit_namespaces,
+            excluded_files=config.excluded_files,
+            template_cache_dir=config.template_cache_dir,
+            toctree=config.toctree,
+        )
+    else:
+        # existing excluded files, like `index`, are not regenerated, so
+        # their toctrees must be left as they are.
+        kept = (
+            set()
+            if config.force
+            else {
+                name
+                for name in config.excluded_files
+                if (output_dir / f"{name}.{config.suffix}").exists()
+            }
+        )
+        is_help = feed_sphinx_apidoc(
+            str(output_dir),
+            str(config.package_dir),
+            *config.sphinx_arguments,
+            implicit_namespaces=config.implicit_namespaces,
+            force=config.force,
+            suffix=config.suffix,
+            template_cache_dir=config.template_cache_dir,
+        )
+        generated = time.perf_counter()
+        result.durations["generate"] = generated - start
+        if is_help:
+            return
+        rename_files(
+            output_dir,
+            config.package_dir,
+            dry_run=config.dry_run,
+            force=force,
+            result=result,
+            package_name=package_name,
+            extension=config.suffix,
+            implicit_namespaces=config.implicit_namespaces,
+            excluded_files=config.excluded_files,
+        )
+        if config.toctree is not None and not config.dry_run:
+            rewrite_nested_toctrees(
+                output_dir,
+                [
+                    *(dest for _, dest in result.moved),
+                    *(
+                        page
+                        for page in result.excluded
+                        if page.stem not in kept
+                    ),
+                ],
+                config.package_dir,
+                toctree=config.toctree,
+                force=config.force,
+                result=result,
+                package_name=package_name,
+                extension=config.suffix,
+                implicit_namespaces=config.implicit_namespaces,
+                excluded_files=config.excluded_files,
+            )
+        result.durations["place"] = time.perf_counter() - generated
+
+    if metadata is not None and not result.failed:
+        _save_metadata(output_dir, metadata)
@@ -0,0 +1,318 @@
+"""
+Write the nested documentation tree straight into a tar or zip archive.
+
+The pages are rendered by ``sphinx-apidoc`` in memory and every page is
+streamed into the archive at its nested path as soon as it is produced, so no
+intermediate files are created. All entries carry fixed metadata, so the same
+input always produces a byte-for-byte identical archive.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import secrets
+import tarfile
+import typing
+import zipfile
+from contextlib import ExitStack
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+
+from .core import PlacementResult, place_nested_pages
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]
+
+if typing.TYPE_CHECKING:
+    from typing import BinaryIO, Iterable
+
+    from .toctree import ToctreeOptions
+
+logger = logging.getLogger(__name__)
+
+# Zip archives cannot represent timestamps before 1980, so both formats use
+# the earliest timestamp that zip supports.
+_FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+_FIXED_MTIME = 315532800
+
+_FILE_MODE = 0o644
+
+# archive suffix => tarfile compression type. `None` denotes a zip archive.
+_ARCHIVE_FORMATS: dict[str, str | None] = {
+    ".tar": "",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.bz2": "bz2",
+    ".tbz2": "bz2",
+    ".tar.xz": "xz",
+    ".txz": "xz",
+    ".tar.zst": "zst",
+    ".tzst": "zst",
+    ".zip": None,
+}
+
+
+def get_archive_format(archive_path: Path) -> str | None:
+    """Determines the archive format from the name of the archive.
+
+    Args:
+        archive_path: Path to the archive.
+
+    Returns:
+        The ``tarfile`` compression type (``""`` for an uncompressed tarball)
+        or ``None`` for a zip archive.
+
+    Raises:
+        ValueError: If the suffix does not name a supported archive format.
+    """
+    name = archive_path.name.lower()
+    for suffix, archive_format in _ARCHIVE_FORMATS.items():
+        if name.endswith(suffix):
+            return archive_format
+
+    supported = ", ".join(_ARCHIVE_FORMATS)
+    msg = f"unsupported archive format: {archive_path} (expected {supported})"
+    raise ValueError(msg)
+
+
+class ArchiveWriter:
+    """
+    Writes text files into a tar or zip archive with deterministic metadata.
+
+    The archive is built in a temporary file next to ``archive_path`` and
+    only moved into place when the writer is closed. If the writer is
+    left because of an exception, the temporary file is removed and
+    ``archive_path`` is not touched, so a failed run never leaves a
+    truncated archive behind.
+
+    Args:
+        archive_path:
+            Path of the archive to create. Its suffix selects the format, see
+            :py:func:`get_archive_format`.
+    """
+
+    def __init__(self, archive_path: Path) -> None:
+        self.archive_path = archive_path
+        self._names: set[str] = set()
+        self._stack = ExitStack()
+        self._tar: tarfile.TarFile | None = None
+        self._zip: zipfile.ZipFile | None = None
+
+        archive_format = get_archive_format(archive_path)
+        # same directory, so the final rename stays on one filesystem.
+        self._tmp_path = archive_path.with_name(
+            f".{archive_path.name}.{secrets.token_hex(4)}.tmp"
+        )
+        try:
+            fileobj = self._stack.enter_context(self._tmp_path.open("xb"))
+            if archive_format is None:
+                self._zip = self._stack.enter_context(
+                    zipfile.ZipFile(
+                        fileobj,
+                        "w",
+                        compression=zipfile.ZIP_DEFLATED,
+                    )
+                )
+            else:
+                self._tar = self._open_tarfile(fileobj, archive_format)
+        except BaseException:
+            self.discard()
+            raise
+
+    def _open_tarfile(
+        self,
+        fileobj: BinaryIO,
+        compression: str,
+    ) -> tarfile.TarFile:
+        stream: BinaryIO | gzip.GzipFile = fileobj
+        if compression == "gz":
+            # tarfile stores the current time in the gzip header, which would
+            # make the archive hash differently on each run.
+            stream = self._stack.enter_context(
+                gzip.GzipFile(
+                    filename="",
+                    mode="wb",
+                    fileobj=fileobj,
+                    mtime=0,
+                )
+            )
+            compression = ""
+        elif compression == "zst" and zstandard is not None:
+            # tarfile only supports zstd natively from Python 3.14.
+            stream = self._stack.enter_context(
+                zstandard.ZstdCompressor().stream_writer(
+                    fileobj,
+                    closefd=False,
+                )
+            )
+            compression = ""
+
+        mode = f"w:{compression}" if compression else "w"
+        try:
+            tar = tarfile.open(  # noqa: SIM115
+                fileobj=stream,  # type: ignore[arg-type]
+                mode=mode,  # type: ignore[call-overload]
+                format=tarfile.PAX_FORMAT,
+            )
+        except tarfile.CompressionError as e:
+            msg = f"{self.archive_path}: {e}"
+            if compression == "zst":
+                msg += " (install sphinx-nested-apidoc[zstd])"
+            raise ValueError(msg) from e
+        return self._stack.enter_context(tar)
+
+    def add(self, name: Path, text: str) -> bool:
+        """Adds a text file to the archive.
+
+        Args:
+            name: Relative path of the file inside the archive.
+            text: The contents of the file. It is encoded as UTF-8.
+
+        Returns:
+            ``True`` if the file is added, ``False`` if an entry with the same
+            name already exists in the archive.
+        """
+        arcname = PurePosixPath(*name.parts).as_posix()
+        if arcname in self._names:
+            return False
+        self._names.add(arcname)
+
+        data = text.encode("utf-8")
+        if self._zip is not None:
+            zinfo = zipfile.ZipInfo(arcname, date_time=_FIXED_DATE_TIME)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.external_attr = (0o100000 | _FILE_MODE) << 16
+            self._zip.writestr(zinfo, data)
+        elif self._tar is not None:
+            tinfo = tarfile.TarInfo(arcname)
+            tinfo.size = len(data)
+            tinfo.mtime = _FIXED_MTIME
+            tinfo.mode = _FILE_MODE
+            tinfo.uid = tinfo.gid = 0
+            tinfo.uname = tinfo.gname = ""
+            self._tar.addfile(tinfo, BytesIO(data))
+        return True
+
+    def close(self) -> None:
+        """Finalizes the archive and moves it to ``archive_path``."""
+        try:
+            self._stack.close()
+        except BaseException:
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+        self._tmp_path.replace(self.archive_path)
+
+    def discard(self) -> None:
+        """Abandons the archive without touching ``archive_path``."""
+        try:
+            self._stack.close()
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> ArchiveWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        *exc_info: object,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_archive(
+    archive_path: Path,
+    package_dir: Path,
+    *sphinx_arguments: str,
+    package_name: Path | None = None,
+    extension: str = "rst",
+    implicit_namespaces: bool = False,
+    dry_run: bool = False,
+    excluded_files: Iterable[str] = ("index", "modules"),
+    result: PlacementResult | None = None,
+    template_cache_dir: Path | None = None,
+    toctree: ToctreeOptions | None = None,
+) -> None:
+    """
+    Generates the nested documentation for a package directly into an
+    archive.
+
+    Args:
+        archive_path:
+            Path of the archive to create. Its suffix selects the format, see
+            :py:func:`get_archive_format`.
+        package_dir: The directory of the package to document.
+        sphinx_arguments: The flags and command to pass to ``sphinx-apidoc``.
+        package_name:
+            Name of the directory to put all the package documentation in.
+            See :py:func:`~sphinx_nested_apidoc.core.rename_files`.
+        extension: The extension of the ``sphinx-apidoc`` generated file.
+        implicit_namespaces:
+            Interpret module paths according to PEP-0420 implicit namespaces
+            specification.
+        dry_run: Runs but does not actually create the archive.
+        excluded_files:
+            Name of files (**without extension**) that should be stored at
+            the root of the archive with their original names. By default, it
+            excludes ``index`` and ``modules``.
+        result:
+            If given, the handled files are recorded in it. The destinations
+            are the names of the entries in the archive.
+        template_cache_dir:
+            Directory to keep the compiled templates in. See
+            :py:func:`~sphinx_nested_apidoc.core.render_sphinx_apidoc`.
+        toctree:
+            If given, the toctrees are rewritten to refer to the nested
+            pages. See
+            :py:class:`~sphinx_nested_apidoc.toctree.ToctreeOptions`.
+
+    Raises:
+        ValueError: If the suffix does not name a supported archive format.
+    """
+    get_archive_format(archive_path)
+
+    def add(source_file: Path, dest_name: Path, text: str) -> bool:
+        if archive is None:
+            logger.info(
+                "%s would be added to %s as %s",
+                source_file,
+                archive_path,
+                dest_name,
+            )
+        elif archive.add(dest_name, text):
+            logger.info("%s -> %s:%s", source_file, archive_path, dest_name)
+        else:
+            logger.warning(
+                "%s already exists in %s. Skipping.",
+                dest_name,
+                archive_path,
+            )
+            if result is not None:
+                result.skipped.append(dest_name)
+            return False
+        return True
+
+    with ExitStack() as stack:
+        archive = (
+            None
+            if dry_run
+            else stack.enter_context(ArchiveWriter(archive_path))
+        )
+        place_nested_pages(
+            package_dir,
+            add,
+            *sphinx_arguments,
+            package_name=package_name,
+            extension=extension,
+            implicit_namespaces=implicit_namespaces,
+            excluded_files=excluded_files,
+            result=result,
+            template_cache_dir=template_cache_dir,
+            toctree=toctree,
+        )
@@ -1,23 +1,41 @@
 from __future__ import annotations
 
+import dataclasses
 import functools
+import importlib
 import logging
+import os
 import sys
-from contextlib import redirect_stdout
+from contextlib import contextmanager, redirect_stdout
 from os import path
 from pathlib import Path
-from typing import Iterable, Iterator
+from typing import Any, Callable, Iterable, Iterator
 
+from jinja2 import FileSystemBytecodeCache
 from sphinx.ext import apidoc
 
+from .toctree import ToctreeOptions, rewrite_toctrees
+
 logger = logging.getLogger(__name__)
 
+# whether files can be linked, renamed and removed relative to an open
+# directory, which saves the kernel from resolving the full path every time.
+_SUPPORTS_DIR_FD = {os.open, os.link, os.rename, os.unlink} <= (
+    os.supports_dir_fd
+)
+
+# upper bound on the number of directory descriptors kept open at once.
+_MAX_OPEN_DIRS = 64
+
+# template renderers shared by every sphinx-apidoc run in this process, keyed
+# by template directories, language and bytecode cache directory.
+_renderers: dict[tuple[tuple[str, ...], str | None, str | None], Any] = {}
+
 
-@functools.lru_cache
 def _safe_makedirs(name: Path, mode: int = 0o755) -> bool:
     """
-    The same ``Path.mkdir``, except that it caches its arguments and returns
-    boolean instead of raising an exception.
+    The same ``Path.mkdir``, except that it returns boolean instead of raising
+    an exception.
 
     Args:
         name: The name of the directory to create.
@@ -35,6 +53,91 @@ def _safe_makedirs(name: Path, mode: int = 0o755) -> bool:
     return True
 
 
+class _DirectoryFds:
+    """
+    Keeps a bounded number of directories open so that files in them can be
+    addressed relative to the directory descriptor.
+
+    On platforms without ``dir_fd`` support, no directory is opened and the
+    full path is used instead.
+    """
+
+    def __init__(self, max_open: int = _MAX_OPEN_DIRS) -> None:
+        self._max_open = max_open
+        self._fds: dict[Path, int] = {}
+
+    def resolve(self, file: Path) -> tuple[str | Path, int | None]:
+        """
+        Returns the name of ``file`` relative to its open parent directory,
+        and the descriptor of the directory.
+        """
+        if not _SUPPORTS_DIR_FD:
+            return file, None
+
+        directory = file.parent
+        fd = self._fds.pop(directory, None)
+        if fd is None:
+            if len(self._fds) >= self._max_open:
+                # evict the least recently used directory.
+                os.close(self._fds.pop(next(iter(self._fds))))
+            fd = os.open(
+                directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+            )
+        self._fds[directory] = fd
+        return file.name, fd
+
+    def close(self) -> None:
+        while self._fds:
+            os.close(self._fds.popitem()[1])
+
+    def __enter__(self) -> _DirectoryFds:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _move_file(
+    source: Path,
+    dest: Path,
+    dir_fds: _DirectoryFds,
+    replace: bool = False,
+) -> bool:
+    """
+    Moves ``source`` to ``dest`` without checking for ``dest`` beforehand.
+
+    If ``replace`` is ``False``, ``dest`` is created exclusively by hard
+    linking it to ``source``, so an existing file is never overwritten. Either
+    way ``source`` is removed.
+
+    Returns:
+        ``True`` if ``source`` is moved, ``False`` if ``dest`` already exists.
+    """
+    src_name, src_fd = dir_fds.resolve(source)
+    dst_name, dst_fd = dir_fds.resolve(dest)
+    if replace:
+        os.replace(src_name, dst_name, src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+        return True
+
+    try:
+        os.link(src_name, dst_name, src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+    except FileExistsError:
+        moved = False
+    except OSError:
+        # the filesystem does not support hard links.
+        if dest.exists():
+            moved = False
+        else:
+            source.rename(dest)
+            return True
+    else:
+        moved = True
+
+    # remove the source file, or the leftover source file if not moved.
+    os.unlink(src_name, dir_fd=src_fd)
+    return moved
+
+
 def _add_flag_if_not_present(
     arg: list[str],
     cond: bool,
@@ -77,6 +180,7 @@ def feed_sphinx_apidoc(
     implicit_namespaces: bool = False,
     force: bool = False,
     suffix: str = "rst",
+    template_cache_dir: Path | None = None,
 ) -> bool:
     """Pass commands and flags to ``sphinx-apidoc``.
 
@@ -95,6 +199,9 @@ def feed_sphinx_apidoc(
             specification.
         force: Replace existing files.
         suffix: File suffix of the generated files.
+        template_cache_dir:
+            Directory to keep the compiled templates in. See
+            :py:func:`render_sphinx_apidoc`.
 
     Returns:
         True if help flag is passed, otherwise False.
@@ -142,12 +249,185 @@ def feed_sphinx_apidoc(
 
     logger.debug("arguments: %s", arguments)
     logger.debug("stdout: %s", stdout)
-    with redirect_stdout(stdout):
+    with redirect_stdout(stdout), _reuse_apidoc_renderers(template_cache_dir):
         apidoc.main(arguments)
 
     return is_help
 
 
+def _apidoc_generator_module() -> Any:
+    """
+    Returns the module in which ``sphinx-apidoc`` looks up ``write_file``.
+
+    Since Sphinx 8.2 ``sphinx.ext.apidoc`` is a package and the page writers
+    live in its private ``_generate`` module.
+    """
+    try:
+        return importlib.import_module("sphinx.ext.apidoc._generate")
+    except ImportError:  # pragma: no cover
+        return apidoc
+
+
+@contextmanager
+def _intercept_apidoc_writes(
+    sink: Callable[[Path, str], object],
+) -> Iterator[None]:
+    """
+    Redirects every page written by ``sphinx-apidoc`` to ``sink`` instead of
+    the disk.
+
+    ``sphinx-apidoc`` also collects the name of every written page, which it
+    only needs for ``--remove-old``. That option does nothing in dry run
+    mode, so the names of the pages of each package are dropped as soon as
+    the package is done, and memory use does not grow with the number of
+    modules.
+
+    Args:
+        sink:
+            Called with the flat file name (for example ``a.b.c.rst``) and
+            the rendered text of every page.
+    """
+    module = _apidoc_generator_module()
+    original_write_file = module.write_file
+    original_create_package_file = module.create_package_file
+
+    def write_file(name: str, text: str, opts: Any) -> Path:
+        file_name = Path(f"{name}{path.extsep}{opts.suffix}")
+        sink(file_name, text)
+        return file_name
+
+    def create_package_file(*args: Any, **kwargs: Any) -> list[Path]:
+        original_create_package_file(*args, **kwargs)
+        return []
+
+    module.write_file = write_file
+    module.create_package_file = create_package_file
+    try:
+        yield
+    finally:
+        module.write_file = original_write_file
+        module.create_package_file = original_create_package_file
+
+
+@contextmanager
+def _reuse_apidoc_renderers(
+    template_cache_dir: Path | None = None,
+) -> Iterator[None]:
+    """
+    Makes ``sphinx-apidoc`` reuse one template renderer per set of template
+    directories, instead of setting up a new one and compiling the templates
+    again for every page.
+
+    The renderers are kept for the lifetime of the process. Jinja reloads a
+    template by itself if it changes on the disk.
+
+    Args:
+        template_cache_dir:
+            Directory to keep the compiled templates in. Jinja keys them by
+            the content of the template. If ``None``, the templates are only
+            kept in memory and nothing is written to the disk.
+    """
+    module = _apidoc_generator_module()
+    renderer_class = module.ReSTRenderer
+    cache_dir = (
+        str(template_cache_dir.resolve())
+        if template_cache_dir is not None
+        else None
+    )
+    # the working directory does not change during a run, so each spelling
+    # of the template directories is resolved once instead of per page.
+    resolved: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+    def get_renderer(
+        template_path: Iterable[str | os.PathLike[str]] | None = None,
+        language: str | None = None,
+    ) -> Any:
+        spelling = tuple(
+            str(template_dir) for template_dir in template_path or ()
+        )
+        template_dirs = resolved.get(spelling)
+        if template_dirs is None:
+            template_dirs = resolved[spelling] = tuple(
+                str(Path(template_dir).resolve()) for template_dir in spelling
+            )
+        key = (template_dirs, language, cache_dir)
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = renderer_class(template_path, language)
+            if cache_dir is not None:
+                Path(cache_dir).mkdir(parents=True, exist_ok=True)
+                renderer.env.bytecode_cache = FileSystemBytecodeCache(
+                    cache_dir
+                )
+            _renderers[key] = renderer
+        return renderer
+
+    module.ReSTRenderer = get_renderer
+    try:
+        yield
+    finally:
+        module.ReSTRenderer = renderer_class
+
+
+def render_sphinx_apidoc(
+    module_path: str,
+    sink: Callable[[Path, str], object],
+    *sphinx_arguments: str,
+    implicit_namespaces: bool = False,
+    suffix: str = "rst",
+    template_cache_dir: Path | None = None,
+) -> None:
+    """Run ``sphinx-apidoc`` without writing anything to the disk.
+
+    Every generated page is handed to ``sink`` as soon as it is rendered,
+    in the order ``sphinx-apidoc`` produces them.
+
+    Arguments:
+        module_path: The path to the package that is being documented.
+        sink:
+            Called with the flat file name (for example ``a.b.c.rst``) and
+            the rendered text of every page.
+        sphinx_arguments: The flags and command to pass to ``sphinx-apidoc``.
+
+    Keyword arguments:
+        implicit_namespaces:
+            Interpret module paths according to PEP-0420 implicit namespaces
+            specification.
+        suffix: File suffix of the generated files.
+        template_cache_dir:
+            Directory to keep the compiled templates in, so that later
+            processes do not have to compile them again. If ``None``, the
+            compiled templates are only kept in memory.
+
+    Note:
+        ``sphinx-apidoc`` is run in dry run mode, so the files created by
+        ``sphinx-quickstart`` when ``--full`` is passed are not generated.
+    """
+    arguments = [
+        "--output-dir",
+        os.curdir,
+        module_path,
+        "--separate",
+        "--suffix",
+        suffix,
+        *sphinx_arguments,
+    ]
+    _add_flag_if_not_present(
+        arguments,
+        implicit_namespaces,
+        None,
+        "--implicit-namespaces",
+    )
+    # dry run stops sphinx-apidoc from creating the output directory.
+    _add_flag_if_not_present(arguments, True, "-n", "--dry-run")
+
+    logger.debug("arguments: %s", arguments)
+    with _intercept_apidoc_writes(sink), _reuse_apidoc_renderers(
+        template_cache_dir
+    ):
+        apidoc.main(arguments)
+
+
 def yield_source_files(
     source_dir: Path,
     extension: str = "rst",
@@ -168,9 +448,18 @@ def yield_source_files(
         msg = "extension must not start with '.'"
         raise ValueError(msg)
 
-    yield from filter(
-        Path.is_file, source_dir.glob(f"*{path.extsep}{extension}")
-    )
+    suffix = f"{path.extsep}{extension}"
+    # the directory is read completely before yielding, since the caller may
+    # move files out of it. `DirEntry.is_file` is answered from the listing
+    # itself on most platforms, so no file is stat'ed.
+    with os.scandir(source_dir) as it:
+        entries = [
+            entry.name
+            for entry in it
+            if entry.name.endswith(suffix) and entry.is_file()
+        ]
+    for name in entries:
+        yield source_dir / name
 
 
 def get_nested_dir_filename(sphinx_source_file: Path) -> Path:
@@ -256,6 +545,23 @@ def get_destination_filename(
     return dest_name
 
 
+@dataclasses.dataclass
+class PlacementResult:
+    """Files handled while placing the generated pages."""
+
+    #: ``(source, destination)`` pairs of the placed pages. In dry run, these
+    #: are the pages that would be placed.
+    moved: list[tuple[Path, Path]] = dataclasses.field(default_factory=list)
+    #: Destinations that already existed and were left untouched.
+    skipped: list[Path] = dataclasses.field(default_factory=list)
+    #: Pages that keep their flat name because they are excluded.
+    excluded: list[Path] = dataclasses.field(default_factory=list)
+    #: ``(source, error)`` pairs of the pages that could not be placed.
+    failed: list[tuple[Path, OSError]] = dataclasses.field(
+        default_factory=list
+    )
+
+
 def rename_files(
     sphinx_source_dir: Path,
     package_dir: Path,
@@ -265,6 +571,8 @@ def rename_files(
     dry_run: bool = False,
     force: bool = False,
     excluded_files: Iterable[str] = ("index", "modules"),
+    *,
+    result: PlacementResult | None = None,
 ) -> None:
     """
     Renames the ``sphinx-apidoc`` generated files located in the source
@@ -291,40 +599,568 @@ def rename_files(
             Name of files (**without extension**) that should not be
             renamed/modified. By default, it excludes ``index`` and
             ``modules``.
+
+    Keyword Args:
+        result:
+            If given, the handled files are recorded in it, and files that
+            cannot be moved are recorded instead of raising :py:exc:`OSError`.
+    """
+    created_dirs: set[Path] = set()
+    with _DirectoryFds() as dir_fds:
+        for source_file in yield_source_files(sphinx_source_dir, extension):
+            # ignore `index` and `modules` files by default. `modules` is
+            # generated when `sphinx-apidoc --full` is not used.
+            # file_name: /a/b/c/docs/index.ext => index
+            file_name = source_file.stem
+            if file_name in excluded_files:
+                logger.debug("Skipping excluded file: %s", source_file)
+                if result is not None:
+                    result.excluded.append(source_file)
+                continue
+
+            nested_dir_path = get_destination_filename(
+                source_file,
+                package_dir,
+                extension,
+                implicit_namespaces,
+                package_name,
+            )
+            dest_path = sphinx_source_dir / nested_dir_path
+
+            if dry_run:
+                logger.info(
+                    "%s would be changed to %s", source_file, dest_path
+                )
+            else:
+                try:
+                    moved = _place_file(
+                        source_file,
+                        dest_path,
+                        dir_fds,
+                        created_dirs,
+                        replace=force,
+                    )
+                except OSError as e:
+                    if result is None:
+                        raise
+                    logger.error("Cannot move %s: %s", source_file, e)
+                    result.failed.append((source_file, e))
+                    continue
+
+                if not moved:
+                    logger.warning("%s already exists. Skipping.", dest_path)
+                    if result is not None:
+                        result.skipped.append(dest_path)
+                    continue
+                logger.info("%s -> %s", source_file, dest_path)
+
+            if result is not None:
+                result.moved.append((source_file, dest_path))
+
+
+def _place_file(
+    source_file: Path,
+    dest_path: Path,
+    dir_fds: _DirectoryFds,
+    created_dirs: set[Path],
+    *,
+    replace: bool,
+) -> bool:
+    """
+    Creates the parent directory of ``dest_path`` if needed and moves
+    ``source_file`` to it. See :py:func:`_move_file`.
+    """
+    # NOTE: We can create the directories beforehand by filtering out the dirs
+    # from the destination filename.
+    dest_dir = dest_path.parent
+    if dest_dir not in created_dirs:
+        if not _safe_makedirs(dest_dir, mode=0o755):
+            logger.debug("makedirs: %s already exists", dest_dir)
+        created_dirs.add(dest_dir)
+
+    # leftover source files are removed even if not moved.
+    return _move_file(source_file, dest_path, dir_fds, replace=replace)
+
+
+def _record_page(
+    result: PlacementResult | None,
+    source_file: Path,
+    dest_path: Path,
+    *,
+    placed: bool,
+    excluded: bool = False,
+) -> None:
+    """
+    Records a page in ``result``, if given. Excluded pages are recorded
+    whether or not they are placed, as they keep their flat name.
+    """
+    if result is None:
+        return
+    if excluded:
+        result.excluded.append(dest_path)
+    elif placed:
+        result.moved.append((source_file, dest_path))
+
+
+def _page_destination(
+    sphinx_source_file: Path,
+    package_dir: Path,
+    *,
+    extension: str,
+    implicit_namespaces: bool,
+    package_name: Path | None,
+    excluded_files: Iterable[str],
+) -> Path | None:
+    """
+    Same as :py:func:`get_destination_filename`, except that it returns
+    ``None`` for excluded files, which keep their flat name.
+    """
+    if sphinx_source_file.stem in excluded_files:
+        return None
+    return get_destination_filename(
+        sphinx_source_file,
+        package_dir,
+        extension,
+        implicit_namespaces,
+        package_name,
+    )
+
+
+def _toctree_rewriter(
+    package_dir: Path,
+    extension: str,
+    implicit_namespaces: bool,
+    package_name: Path | None,
+    excluded_files: Iterable[str],
+    *,
+    toctree: ToctreeOptions | None,
+) -> Callable[[Path, str], tuple[str, list[tuple[Path, str]]]]:
+    """
+    Returns a function that rewrites the toctrees of a placed page, see
+    :py:func:`~sphinx_nested_apidoc.toctree.rewrite_toctrees`. If
+    ``toctree`` is ``None``, the pages are left as they are.
     """
-    for source_file in yield_source_files(sphinx_source_dir, extension):
-        # ignore `index` and `modules` files by default. `modules` is generated
-        # when `sphinx-apidoc --full` is not used.
-        # file_name: /a/b/c/docs/index.ext => index
-        file_name = source_file.stem
-        if file_name in excluded_files:
-            logger.debug("Skipping excluded file: %s", source_file)
-            continue
+    if toctree is None:
+        return lambda _page, text: (text, [])
 
-        nested_dir_path = get_destination_filename(
+    def resolve(name: str) -> Path:
+        flat_name = Path(f"{name}{path.extsep}{extension}")
+        return (
+            _page_destination(
+                flat_name,
+                package_dir,
+                extension=extension,
+                implicit_namespaces=implicit_namespaces,
+                package_name=package_name,
+                excluded_files=excluded_files,
+            )
+            or flat_name
+        )
+
+    def rewrite(page: Path, text: str) -> tuple[str, list[tuple[Path, str]]]:
+        return rewrite_toctrees(text, page, resolve, toctree)
+
+    return rewrite
+
+
+def place_nested_pages(
+    package_dir: Path,
+    place: Callable[[Path, Path, str], bool],
+    *sphinx_arguments: str,
+    output_dir: Path | None = None,
+    package_name: Path | None = None,
+    extension: str = "rst",
+    implicit_namespaces: bool = False,
+    excluded_files: Iterable[str] = ("index", "modules"),
+    result: PlacementResult | None = None,
+    template_cache_dir: Path | None = None,
+    toctree: ToctreeOptions | None = None,
+) -> None:
+    """
+    Generates the documentation and hands every page to ``place`` together
+    with its nested destination, as soon as ``sphinx-apidoc`` renders it.
+
+    Args:
+        package_dir: The directory of the package to document.
+        place:
+            Called with the flat file name, the destination and the text of
+            every page, including the child pages split off from long
+            toctrees. Returns ``True`` if the page is placed.
+        sphinx_arguments: The flags and command to pass to ``sphinx-apidoc``.
+        output_dir:
+            Directory the destinations are in. If ``None``, the destinations
+            are relative names.
+        package_name:
+            Name of the directory to put all the package documentation in.
+            See :py:func:`rename_files`.
+        extension: The extension of the ``sphinx-apidoc`` generated file.
+        implicit_namespaces:
+            Interpret module paths according to PEP-0420 implicit namespaces
+            specification.
+        excluded_files:
+            Name of files (**without extension**) that are placed with their
+            flat name. By default, it excludes ``index`` and ``modules``.
+        result: If given, the placed and excluded pages are recorded in it.
+        template_cache_dir:
+            Directory to keep the compiled templates in. See
+            :py:func:`render_sphinx_apidoc`.
+        toctree:
+            If given, the toctrees are rewritten to refer to the nested
+            pages. See
+            :py:class:`~sphinx_nested_apidoc.toctree.ToctreeOptions`.
+    """
+    root = output_dir if output_dir is not None else Path()
+    rewrite = _toctree_rewriter(
+        package_dir,
+        extension,
+        implicit_namespaces,
+        package_name,
+        excluded_files,
+        toctree=toctree,
+    )
+
+    def place_page(source_file: Path, text: str) -> None:
+        dest_name = _page_destination(
             source_file,
             package_dir,
-            extension,
-            implicit_namespaces,
-            package_name,
+            extension=extension,
+            implicit_namespaces=implicit_namespaces,
+            package_name=package_name,
+            excluded_files=excluded_files,
+        )
+        text, child_pages = rewrite(dest_name or source_file, text)
+        dest_path = root / (dest_name or source_file)
+        # excluded pages are placed too, but with their flat name.
+        _record_page(
+            result,
+            source_file,
+            dest_path,
+            placed=place(source_file, dest_path, text),
+            excluded=dest_name is None,
         )
-        dest_path = sphinx_source_dir / nested_dir_path
-        dest_dir = dest_path.parent
+        for child_name, child_text in child_pages:
+            child_path = root / child_name
+            _record_page(
+                result,
+                source_file,
+                child_path,
+                placed=place(source_file, child_path, child_text),
+            )
+
+    render_sphinx_apidoc(
+        str(package_dir),
+        place_page,
+        *sphinx_arguments,
+        implicit_namespaces=implicit_namespaces,
+        suffix=extension,
+        template_cache_dir=template_cache_dir,
+    )
 
+
+def write_nested_files(
+    output_dir: Path,
+    package_dir: Path,
+    *sphinx_arguments: str,
+    package_name: Path | None = None,
+    extension: str = "rst",
+    implicit_namespaces: bool = False,
+    dry_run: bool = False,
+    force: bool = False,
+    excluded_files: Iterable[str] = ("index", "modules"),
+    result: PlacementResult | None = None,
+    template_cache_dir: Path | None = None,
+    toctree: ToctreeOptions | None = None,
+) -> None:
+    """
+    Generates the documentation and writes every page straight to its nested
+    path, without creating the flattened files first.
+
+    Pages are rendered, placed and written one at a time as ``sphinx-apidoc``
+    walks the package, and nothing is kept once a page is written. Memory use
+    therefore does not grow with the number of modules, apart from the
+    package names that ``sphinx-apidoc`` collects for its table of contents.
+
+    Args:
+        output_dir: Directory to place all output in.
+        package_dir: The directory of the package to document.
+        sphinx_arguments: The flags and command to pass to ``sphinx-apidoc``.
+        package_name:
+            Name of the directory to put all the package documentation in.
+            See :py:func:`rename_files`.
+        extension: The extension of the ``sphinx-apidoc`` generated file.
+        implicit_namespaces:
+            Interpret module paths according to PEP-0420 implicit namespaces
+            specification.
+        dry_run: Runs but does not actually write the files.
+        force: Whether to replace files if they already exist.
+        excluded_files:
+            Name of files (**without extension**) that should be written with
+            their flat name. By default, it excludes ``index`` and
+            ``modules``.
+        result:
+            If given, the handled files are recorded in it, and files that
+            cannot be written are recorded instead of raising
+            :py:exc:`OSError`. Note that this keeps a record of every page.
+        template_cache_dir:
+            Directory to keep the compiled templates in. See
+            :py:func:`render_sphinx_apidoc`.
+        toctree:
+            If given, the toctrees are rewritten to refer to the nested
+            pages. See
+            :py:class:`~sphinx_nested_apidoc.toctree.ToctreeOptions`.
+    """
+    mode = "w" if force else "x"
+    # pages of a package are generated together, so remembering the last
+    # directory is enough to avoid creating it over and over.
+    last_dir: Path | None = None
+
+    def write(source_file: Path, dest_path: Path, text: str) -> bool:
+        """Returns ``True`` if the page is written (or would be)."""
+        nonlocal last_dir
         if dry_run:
-            logger.info("%s would be changed to %s", source_file, dest_path)
-            continue
+            logger.info("%s would be written to %s", source_file, dest_path)
+            return True
 
-        # create the directories.
-        # NOTE: We can create the directories beforehand by filtering out the
-        # dirs from the destination filename.
-        if not _safe_makedirs(dest_dir, mode=0o755):
-            logger.debug("makedirs: %s already exists", dest_dir)
+        try:
+            dest_dir = dest_path.parent
+            if dest_dir != last_dir:
+                dest_dir.mkdir(0o755, parents=True, exist_ok=True)
+                last_dir = dest_dir
 
-        if dest_path.exists() and not force:
-            source_file.unlink()  # remove leftover source files.
+            with dest_path.open(mode, encoding="utf-8") as f:
+                f.write(text)
+        except FileExistsError:
             logger.warning("%s already exists. Skipping.", dest_path)
-            continue
+            if result is not None:
+                result.skipped.append(dest_path)
+            return False
+        except OSError as e:
+            if result is None:
+                raise
+            logger.error("Cannot write %s: %s", dest_path, e)
+            result.failed.append((source_file, e))
+            return False
 
-        source_file.rename(dest_path)
         logger.info("%s -> %s", source_file, dest_path)
+        return True
+
+    place_nested_pages(
+        package_dir,
+        write,
+        *sphinx_arguments,
+        output_dir=output_dir,
+        package_name=package_name,
+        extension=extension,
+        implicit_namespaces=implicit_namespaces,
+        excluded_files=excluded_files,
+        result=result,
+        template_cache_dir=template_cache_dir,
+        toctree=toctree,
+    )
+
+
+def rewrite_nested_toctrees(
+    output_dir: Path,
+    pages: Iterable[Path],
+    package_dir: Path,
+    *,
+    toctree: ToctreeOptions,
+    package_name: Path | None = None,
+    extension: str = "rst",
+    implicit_namespaces: bool = False,
+    force: bool = False,
+    excluded_files: Iterable[str] = ("index", "modules"),
+    result: PlacementResult | None = None,
+) -> None:
+    """
+    Rewrites the toctrees of pages that are already placed in ``output_dir``,
+    for example by :py:func:`rename_files`. See
+    :py:func:`~sphinx_nested_apidoc.toctree.rewrite_toctrees`.
+
+    Args:
+        output_dir: The directory the pages are placed in.
+        pages: The placed pages to rewrite.
+        package_dir: The directory of the documented package.
+
+    Keyword Args:
+        toctree: How the toctrees are rewritten.
+        package_name:
+            Name of the directory the package documentation is in. See
+            :py:func:`rename_files`.
+        extension: The extension of the ``sphinx-apidoc`` generated file.
+        implicit_namespaces:
+            Interpret module paths according to PEP-0420 implicit namespaces
+            specification.
+        force: Whether to replace child pages if they already exist.
+        excluded_files:
+            Name of files (**without extension**) that keep their flat name.
+        result:
+            If given, the child pages are recorded in it, and pages that
+            cannot be rewritten are recorded instead of raising
+            :py:exc:`OSError`.
+    """
+    mode = "w" if force else "x"
+    rewrite = _toctree_rewriter(
+        package_dir,
+        extension,
+        implicit_namespaces,
+        package_name,
+        excluded_files,
+        toctree=toctree,
+    )
+    for page in pages:
+        try:
+            text = page.read_text(encoding="utf-8")
+            new_text, child_pages = rewrite(page.relative_to(output_dir), text)
+            if new_text != text:
+                page.write_text(new_text, encoding="utf-8")
+
+            for child_name, child_text in child_pages:
+                child_path = output_dir / child_name
+                child_path.parent.mkdir(0o755, parents=True, exist_ok=True)
+                try:
+                    with child_path.open(mode, encoding="utf-8") as f:
+                        f.write(child_text)
+                except FileExistsError:
+                    logger.warning("%s already exists. Skipping.", child_path)
+                    if result is not None:
+                        result.skipped.append(child_path)
+                    continue
+                logger.info("%s -> %s", page, child_path)
+                _record_page(result, page, child_path, placed=True)
+        except OSError as e:
+            if result is None:
+                raise
+            logger.error("Cannot rewrite %s: %s", page, e)
+            result.failed.append((page, e))
+
+
+@dataclasses.dataclass
+class CheckResult:
+    """
+    Differences between the generated documentation and the nested files
+    already present in the output directory. All paths are relative to the
+    output directory.
+    """
+
+    #: Pages that would be created.
+    added: list[Path] = dataclasses.field(default_factory=list)
+    #: Pages whose content differs from the generated content.
+    changed: list[Path] = dataclasses.field(default_factory=list)
+    #: Existing pages that are no longer generated.
+    orphaned: list[Path] = dataclasses.field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """``True`` if the output directory is out of date."""
+        return bool(self.added or self.changed or self.orphaned)
+
+
+def _orphaned_files(
+    output_dir: Path,
+    expected: set[Path],
+    extension: str,
+    package_name: Path | None,
+) -> Iterator[Path]:
+    """
+    Yields the pages in the nested directories of ``output_dir`` that are not
+    ``expected``.
+    """
+    # only the nested directories belong to us. Everything else, including
+    # the rest of the directories `package_name` is nested in, is left alone.
+    suffix = f"{path.extsep}{extension}"
+    nested_roots: list[Path | str] = sorted(
+        {name.parts[0] for name in expected if name.parent.parts}
+    )
+    if package_name is not None and nested_roots:
+        nested_roots = [package_name]
+    for root in nested_roots:
+        for dirpath, _, filenames in os.walk(output_dir / root):
+            for filename in filenames:
+                if not filename.endswith(suffix):
+                    continue
+                dest_name = Path(dirpath, filename).relative_to(output_dir)
+                if dest_name not in expected:
+                    yield dest_name
+
+
+def check_nested_files(
+    output_dir: Path,
+    package_dir: Path,
+    *sphinx_arguments: str,
+    package_name: Path | None = None,
+    extension: str = "rst",
+    implicit_namespaces: bool = False,
+    excluded_files: Iterable[str] = ("index", "modules"),
+    template_cache_dir: Path | None = None,
+    toctree: ToctreeOptions | None = None,
+) -> CheckResult:
+    """
+    Checks whether the nested files in the output directory match the
+    documentation generated for the package, without writing anything.
+
+    The pages are rendered in memory and placed with the same logic as
+    :py:func:`rename_files`. Each page is compared by size, then by content,
+    against the existing file.
+
+    Args:
+        output_dir: Directory containing the previously generated files.
+        package_dir: The directory of the package to document.
+        sphinx_arguments: The flags and command to pass to ``sphinx-apidoc``.
+        package_name:
+            Name of the directory to put all the package documentation in.
+            See :py:func:`rename_files`.
+        extension: The extension of the ``sphinx-apidoc`` generated file.
+        implicit_namespaces:
+            Interpret module paths according to PEP-0420 implicit namespaces
+            specification.
+        excluded_files:
+            Name of files (**without extension**) that keep their flat name.
+            By default, it excludes ``index`` and ``modules``.
+        template_cache_dir:
+            Directory to keep the compiled templates in. See
+            :py:func:`render_sphinx_apidoc`.
+        toctree:
+            The toctree options the files were written with. See
+            :py:func:`write_nested_files`.
+
+    Returns:
+        The added, changed and orphaned pages, sorted by path.
+    """
+    result = CheckResult()
+    expected: set[Path] = set()
+
+    def compare(_source_file: Path, dest_name: Path, text: str) -> bool:
+        expected.add(dest_name)
+        # the files are written in text mode, with platform line endings.
+        data = text.replace("\n", os.linesep).encode("utf-8")
+        dest_path = output_dir / dest_name
+        try:
+            size = dest_path.stat().st_size
+        except FileNotFoundError:
+            result.added.append(dest_name)
+            return True
+
+        # comparing the sizes first spares reading files that clearly differ.
+        if size != len(data) or dest_path.read_bytes() != data:
+            result.changed.append(dest_name)
+        return True
+
+    place_nested_pages(
+        package_dir,
+        compare,
+        *sphinx_arguments,
+        package_name=package_name,
+        extension=extension,
+        implicit_namespaces=implicit_namespaces,
+        excluded_files=excluded_files,
+        template_cache_dir=template_cache_dir,
+        toctree=toctree,
+    )
+
+    result.orphaned.extend(
+        _orphaned_files(output_dir, expected, extension, package_name)
+    )
+    result.added.sort()
+    result.changed.sort()
+    result.orphaned.sort()
+    return result
@@ -0,0 +1,348 @@
+"""
+Rewrite the toctrees of the generated pages for the nested layout.
+
+``sphinx-apidoc`` lists the children of a package by their flat document
+name, for example ``a.b.c``. Once the pages are nested, these entries must be
+relative to the directory of the page, for example ``c`` or ``c/index``.
+
+Large toctrees make Sphinx resolve and render long tables of contents for
+every page that includes them. :py:class:`ToctreeOptions` can cap their depth
+and split long listings into paginated child pages.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import posixpath
+import re
+import typing
+
+if typing.TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Callable, Iterator
+
+_TOCTREE_RE = re.compile(r"^(?P<indent>[ \t]*)\.\. toctree::[ \t]*$")
+_OPTION_RE = re.compile(r"^:(?P<name>[\w-]+):")
+_ENTRY_RE = re.compile(
+    r"^(?:(?P<title>.*?)\s*<(?P<target>[^<>]+)>|(?P<plain>\S+))$"
+)
+# entries generated by sphinx-apidoc are dotted module names.
+_MODULE_NAME_RE = re.compile(r"^\w+(?:\.\w+)*$")
+
+
+@dataclasses.dataclass(frozen=True)
+class ToctreeOptions:
+    """Controls how the toctrees of the nested pages are written."""
+
+    #: Replace the ``:maxdepth:`` of every toctree with this value.
+    maxdepth: int | None = None
+    #: Split toctrees with more entries than this into child pages with at
+    #: most this many entries each.
+    max_entries: int | None = None
+    #: Replace the entries of toctrees in the nested directories with
+    #: ``*`` and ``*/index`` glob patterns.
+    glob: bool = False
+
+    def __post_init__(self) -> None:
+        if self.maxdepth is not None and self.maxdepth < 1:
+            msg = "maxdepth must be at least 1"
+            raise ValueError(msg)
+        if self.max_entries is not None and self.max_entries < 1:
+            msg = "max_entries must be at least 1"
+            raise ValueError(msg)
+
+
+@dataclasses.dataclass
+class _Entry:
+    title: str | None
+    #: flat name of the target, e.g. `a.b.c`
+    name: str
+    #: nested path of the target relative to the output dir, with suffix.
+    page: Path
+
+
+def _indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _docname(page: Path, relative_to: Path) -> str:
+    """Returns the document name of ``page`` relative to a directory."""
+    return posixpath.relpath(
+        page.with_suffix("").as_posix(),
+        relative_to.as_posix(),
+    )
+
+
+def _parse_entry(line: str, resolve: Callable[[str], Path]) -> _Entry | None:
+    match = _ENTRY_RE.match(line)
+    if match is None:
+        return None
+    name = match["target"] or match["plain"]
+    if name == "self" or not _MODULE_NAME_RE.match(name):
+        return None
+    return _Entry(match["title"], name, resolve(name))
+
+
+def _format_entry(entry: _Entry, relative_to: Path) -> str:
+    docname = _docname(entry.page, relative_to)
+    if entry.title:
+        return f"{entry.title} <{docname}>"
+    return docname
+
+
+def _glob_patterns(entries: list[_Entry], page_dir: Path) -> list[str] | None:
+    """
+    Returns the glob patterns matching exactly the direct children of
+    ``page_dir``, or ``None`` if the entries cannot be expressed that way.
+    """
+    patterns = set()
+    for entry in entries:
+        if entry.title:
+            return None
+        docname = _docname(entry.page, page_dir)
+        if docname.count("/") == 0 and docname != "..":
+            patterns.add("*")
+        elif docname.count("/") == 1 and docname.endswith("/index"):
+            patterns.add("*/index")
+        else:
+            return None
+    return sorted(patterns)
+
+
+def _toctree(
+    directive: str,
+    options: list[str],
+    entries: list[str],
+    indent: str,
+) -> Iterator[str]:
+    yield directive
+    for option in options:
+        yield f"{indent}{option}"
+    yield ""
+    for entry in entries:
+        yield f"{indent}{entry}"
+
+
+def _rewrite_toctree_blocks(
+    text: str,
+    rewrite: Callable[[str, list[str]], list[str]],
+) -> str:
+    """
+    Replaces every toctree in ``text`` with the lines returned by
+    ``rewrite``, which is called with the directive and the lines of its
+    body.
+    """
+    lines = text.splitlines()
+    output: list[str] = []
+    i = 0
+    while i < len(lines):
+        match = _TOCTREE_RE.match(lines[i])
+        if match is None:
+            output.append(lines[i])
+            i += 1
+            continue
+
+        indent = _indent_of(lines[i])
+        end = i + 1
+        while end < len(lines) and (
+            not lines[end].strip() or _indent_of(lines[end]) > indent
+        ):
+            end += 1
+        # trailing blank lines are not part of the toctree.
+        while end > i + 1 and not lines[end - 1].strip():
+            end -= 1
+
+        output.extend(rewrite(lines[i], lines[i + 1 : end]))
+        i = end
+
+    rewritten = "\n".join(output)
+    return f"{rewritten}\n" if text.endswith("\n") else rewritten
+
+
+class _PageRewriter:
+    def __init__(
+        self,
+        page: Path,
+        resolve: Callable[[str], Path],
+        options: ToctreeOptions,
+    ) -> None:
+        self.page = page
+        self.page_dir = page.parent
+        self.resolve = resolve
+        self.options = options
+        self.child_pages: list[tuple[Path, str]] = []
+        self._blocks = 0
+
+    def rewrite(self, text: str) -> str:
+        return _rewrite_toctree_blocks(text, self._rewrite_toctree)
+
+    def _rewrite_toctree(self, directive: str, body: list[str]) -> list[str]:
+        body_lines = [line for line in body if line.strip()]
+        if not body_lines:
+            return [directive, *body]
+        indent = body_lines[0][: _indent_of(body_lines[0])]
+
+        options: list[str] = []
+        entries: list[_Entry] = []
+        for line in body_lines:
+            stripped = line.strip()
+            if not entries and _OPTION_RE.match(stripped):
+                options.append(stripped)
+                continue
+            entry = _parse_entry(stripped, self.resolve)
+            if entry is None:
+                # not generated by sphinx-apidoc, so leave it alone.
+                return [directive, *body]
+            entries.append(entry)
+
+        self._blocks += 1
+        options = self._rewrite_options(options)
+
+        max_entries = self.options.max_entries
+        if max_entries is not None and len(entries) > max_entries:
+            lines = self._paginate(
+                directive, options, entries, indent, max_entries
+            )
+            return list(lines)
+
+        # pages at the top level share the directory with everything else.
+        patterns = (
+            _glob_patterns(entries, self.page_dir)
+            if self.options.glob and self.page_dir.parts
+            else None
+        )
+        if patterns is not None:
+            if ":glob:" not in options:
+                options.append(":glob:")
+            return list(_toctree(directive, options, patterns, indent))
+
+        formatted = [_format_entry(entry, self.page_dir) for entry in entries]
+        return list(_toctree(directive, options, formatted, indent))
+
+    def _rewrite_options(self, options: list[str]) -> list[str]:
+        if self.options.maxdepth is None:
+            return options
+        maxdepth = f":maxdepth: {self.options.maxdepth}"
+        options = [
+            option for option in options if not option.startswith(":maxdepth:")
+        ]
+        return [maxdepth, *options]
+
+    def _paginate(
+        self,
+        directive: str,
+        options: list[str],
+        entries: list[_Entry],
+        indent: str,
+        size: int,
+    ) -> Iterator[str]:
+        """
+        Moves the entries into child pages of at most ``size`` entries and
+        lists the child pages in the toctree instead.
+        """
+        # `-` cannot appear in a module name, so the child pages never clash
+        # with the generated pages.
+        child_dir = self.page_dir / f"{self.page.stem}-toc"
+        child_options = [option for option in options if option != ":glob:"]
+
+        child_docnames = []
+        for start in range(0, len(entries), size):
+            chunk = entries[start : start + size]
+            child_page = child_dir / (
+                f"{self._blocks}-{start // size + 1}{self.page.suffix}"
+            )
+            title = f"{chunk[0].name} - {chunk[-1].name}"
+            child_text = "\n".join(
+                [
+                    title,
+                    "=" * len(title),
+                    "",
+                    *_toctree(
+                        directive.lstrip(),
+                        child_options,
+                        [_format_entry(entry, child_dir) for entry in chunk],
+                        "   ",
+                    ),
+                    "",
+                ]
+            )
+            self.child_pages.append((child_page, child_text))
+            child_docnames.append(_docname(child_page, self.page_dir))
+
+        yield from _toctree(directive, child_options, child_docnames, indent)
+
+
+def rewrite_toctrees(
+    text: str,
+    page: Path,
+    resolve: Callable[[str], Path],
+    options: ToctreeOptions,
+) -> tuple[str, list[tuple[Path, str]]]:
+    """Rewrites the toctrees of a generated page for the nested layout.
+
+    Only toctrees whose entries all look like ``sphinx-apidoc`` generated
+    document names are rewritten.
+
+    Args:
+        text: The content of the page.
+        page:
+            Nested path of the page, relative to the output directory and
+            with its suffix.
+        resolve:
+            Maps the flat name of a generated page (for example ``a.b.c``) to
+            its nested path relative to the output directory, with suffix.
+        options: How to write the toctrees.
+
+    Returns:
+        The rewritten page and the paginated child pages, as ``(path, text)``
+        pairs relative to the output directory.
+    """
+    rewriter = _PageRewriter(page, resolve, options)
+    return rewriter.rewrite(text), rewriter.child_pages
+
+
+def move_toctree_entries(
+    text: str,
+    page: Path,
+    old_dir: Path,
+    new_dir: Path,
+) -> str:
+    """
+    Points the toctree entries of a page that refer to documents in
+    ``old_dir`` to the same documents in ``new_dir``.
+
+    Args:
+        text: The content of the page.
+        page:
+            Path of the page, relative to the output directory and with its
+            suffix.
+        old_dir:
+            The directory that was moved, relative to the output directory.
+        new_dir: Where ``old_dir`` was moved to.
+
+    Returns:
+        The rewritten page. Other entries are left as they are.
+    """
+    page_dir = page.parent.as_posix()
+    old_prefix = f"{old_dir.as_posix()}/"
+
+    def move(line: str) -> str:
+        stripped = line.strip()
+        match = _ENTRY_RE.match(stripped)
+        if match is None or _OPTION_RE.match(stripped):
+            return line
+        target = match["target"] or match["plain"]
+        docname = posixpath.normpath(posixpath.join(page_dir, target))
+        if not docname.startswith(old_prefix):
+            return line
+        moved = posixpath.relpath(
+            posixpath.join(new_dir.as_posix(), docname[len(old_prefix) :]),
+            page_dir or ".",
+        )
+        entry = f"{match['title']} <{moved}>" if match["target"] else moved
+        return f"{line[: _indent_of(line)]}{entry}"
+
+    return _rewrite_toctree_blocks(
+        text,
+        lambda directive, body: [directive, *map(move, body)],
+    )
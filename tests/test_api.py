@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from sphinx_nested_apidoc import RunConfig, api, core
+from sphinx_nested_apidoc.__main__ import main
+from sphinx_nested_apidoc.toctree import ToctreeOptions
+
+
+@pytest.fixture
+def package_dir(tmp_path: Path) -> Path:
+    package = tmp_path / "mymodule"
+    (package / "fruits").mkdir(parents=True)
+    for name in ("__init__.py", "base.py", "fruits/__init__.py"):
+        (package / name).touch()
+    return package
+
+
+def test_run(tmp_path: Path, package_dir: Path):
+    docs = tmp_path / "docs"
+    result = api.run(RunConfig(package_dir=package_dir, output_dir=docs))
+
+    assert result.ok
+    assert sorted(dest.relative_to(docs) for _, dest in result.moved) == [
+        Path("mymodule/base.rst"),
+        Path("mymodule/fruits/index.rst"),
+        Path("mymodule/index.rst"),
+    ]
+    assert result.excluded == [docs / "modules.rst"]
+    assert not result.skipped
+    assert not result.failed
+    assert set(result.durations) == {"generate", "place", "total"}
+
+    # the output directory may be removed between runs.
+    for _, dest in result.moved:
+        dest.unlink()
+    result = api.run(RunConfig(package_dir=package_dir, output_dir=docs))
+    assert len(result.moved) == 3
+
+    result = api.run(RunConfig(package_dir=package_dir, output_dir=docs))
+    assert not result.moved
+    assert len(result.skipped) == 3
+
+
+def test_run_stream(tmp_path: Path, package_dir: Path):
+    docs = tmp_path / "docs"
+    config = RunConfig(package_dir=package_dir, output_dir=docs, stream=True)
+    result = api.run(config)
+    assert len(result.moved) == 3
+    assert result.excluded == [docs / "modules.rst"]
+    assert set(result.durations) == {"total"}
+
+    result = api.run(config)
+    assert len(result.skipped) == 4
+
+
+@pytest.mark.parametrize(
+    "flags", [["--stream", "-o", "docs"], ["--output-archive", "docs.zip"]]
+)
+def test_run_full_is_rejected_when_streaming(
+    tmp_path: Path, package_dir: Path, flags: list[str]
+):
+    # sphinx-apidoc runs in dry run, so `--full` would silently do nothing.
+    config = RunConfig(
+        package_dir=package_dir,
+        output_dir=tmp_path / "docs",
+        output_archive=(
+            tmp_path / "docs.zip" if "--output-archive" in flags else None
+        ),
+        stream="--stream" in flags,
+        sphinx_arguments=("--full",),
+    )
+    with pytest.raises(ValueError, match="--full"):
+        api.run(config)
+
+    with pytest.raises(SystemExit):
+        main([*flags, str(package_dir), "--full"])
+    assert not any(tmp_path.glob("docs*"))
+
+
+def test_run_check(tmp_path: Path, package_dir: Path):
+    docs = tmp_path / "docs"
+    result = api.run(
+        RunConfig(package_dir=package_dir, output_dir=docs, check=True)
+    )
+    assert not result.ok
+    assert result.check is not None
+    assert len(result.check.added) == 4
+    assert not docs.exists()
+
+
+def test_run_requires_output(package_dir: Path):
+    with pytest.raises(ValueError, match="output_dir or output_archive"):
+        api.run(RunConfig(package_dir=package_dir))
+
+
+def test_main_does_not_leak_logging(tmp_path: Path, package_dir: Path):
+    package_logger = logging.getLogger("sphinx_nested_apidoc")
+    handlers = list(package_logger.handlers)
+    level = package_logger.level
+
+    for _ in range(3):
+        assert (
+            main(["-q", "-o", str(tmp_path / "docs"), str(package_dir)]) == 0
+        )
+
+    assert package_logger.handlers == handlers
+    assert package_logger.level == level
+
+
+class TestRemap:
+    def test_disabled_by_default(self, tmp_path: Path, package_dir: Path):
+        docs = tmp_path / "docs"
+        api.run(RunConfig(package_dir=package_dir, output_dir=docs))
+        assert not (docs / api.METADATA_FILENAME).exists()
+
+        result = api.run(
+            RunConfig(
+                package_dir=package_dir,
+                output_dir=docs,
+                package_name=Path("src"),
+            )
+        )
+        assert result.remapped is None
+        assert (docs / "mymodule/index.rst").is_file()
+        assert (docs / "src/index.rst").is_file()
+
+    def test_package_name_change_moves_directory(
+        self, tmp_path: Path, package_dir: Path, mocker: MockerFixture
+    ):
+        docs = tmp_path / "docs"
+        api.run(
+            RunConfig(package_dir=package_dir, output_dir=docs, remap=True)
+        )
+        before = (docs / "mymodule/fruits/index.rst").read_text()
+
+        apidoc_main = mocker.spy(core.apidoc, "main")
+        result = api.run(
+            RunConfig(
+                package_dir=package_dir,
+                output_dir=docs,
+                package_name=Path("src"),
+                remap=True,
+            )
+        )
+
+        apidoc_main.assert_not_called()
+        assert result.remapped == (docs / "mymodule", docs / "src")
+        assert not (docs / "mymodule").exists()
+        assert (docs / "src/fruits/index.rst").read_text() == before
+        assert not core.check_nested_files(
+            docs, package_dir, package_name=Path("src")
+        )
+
+    def test_toctree_entries_follow_the_directory(
+        self, tmp_path: Path, package_dir: Path, mocker: MockerFixture
+    ):
+        docs = tmp_path / "docs"
+        config = RunConfig(
+            package_dir=package_dir,
+            output_dir=docs,
+            toctree=ToctreeOptions(maxdepth=2),
+            remap=True,
+        )
+        api.run(config)
+        assert "   mymodule/index\n" in (docs / "modules.rst").read_text()
+
+        apidoc_main = mocker.spy(core.apidoc, "main")
+        config = dataclasses.replace(config, package_name=Path("api/src"))
+        result = api.run(config)
+
+        apidoc_main.assert_not_called()
+        assert result.remapped == (docs / "mymodule", docs / "api/src")
+        assert "   api/src/index\n" in (docs / "modules.rst").read_text()
+        check = api.run(dataclasses.replace(config, check=True)).check
+        assert check is not None
+        assert not check
+
+    def test_package_rename_updates_pages(
+        self, tmp_path: Path, package_dir: Path
+    ):
+        docs = tmp_path / "docs"
+        api.run(
+            RunConfig(package_dir=package_dir, output_dir=docs, remap=True)
+        )
+
+        renamed = package_dir.rename(tmp_path / "newname")
+        result = api.run(
+            RunConfig(package_dir=renamed, output_dir=docs, remap=True)
+        )
+
+        assert result.remapped == (docs / "mymodule", docs / "newname")
+        assert not (docs / "mymodule").exists()
+        assert "newname.fruits" in (docs / "newname/index.rst").read_text()
+        # like in any other run, existing excluded files are only replaced
+        # with `force`.
+        check = core.check_nested_files(docs, renamed)
+        assert check.changed == [Path("modules.rst")]
+        assert not check.added
+        assert not check.orphaned
+
+    def test_other_package_is_left_alone(
+        self, tmp_path: Path, package_dir: Path
+    ):
+        docs = tmp_path / "docs"
+        api.run(
+            RunConfig(package_dir=package_dir, output_dir=docs, remap=True)
+        )
+
+        # same layout, so only the package path tells them apart.
+        other = tmp_path / "other"
+        (other / "fruits").mkdir(parents=True)
+        for name in ("__init__.py", "base.py", "fruits/__init__.py"):
+            (other / name).touch()
+        result = api.run(
+            RunConfig(package_dir=other, output_dir=docs, remap=True)
+        )
+
+        assert result.remapped is None
+        assert "mymodule.fruits" in (docs / "mymodule/index.rst").read_text()
+        assert "other.fruits" in (docs / "other/index.rst").read_text()
+
+    def test_layout_change_regenerates(
+        self, tmp_path: Path, package_dir: Path
+    ):
+        docs = tmp_path / "docs"
+        api.run(
+            RunConfig(package_dir=package_dir, output_dir=docs, remap=True)
+        )
+
+        (package_dir / "fruits/mango.py").touch()
+        result = api.run(
+            RunConfig(
+                package_dir=package_dir,
+                output_dir=docs,
+                package_name=Path("src"),
+                remap=True,
+            )
+        )
+
+        assert result.remapped is None
+        assert (docs / "src/fruits/mango.rst").is_file()
+
+
+def test_run_toctree(tmp_path: Path, package_dir: Path):
+    (package_dir / "extra.py").touch()
+    docs = tmp_path / "docs"
+    config = RunConfig(
+        package_dir=package_dir,
+        output_dir=docs,
+        toctree=ToctreeOptions(maxdepth=2, max_entries=1),
+    )
+    result = api.run(config)
+    assert result.ok
+    assert (docs / "mymodule/index-toc/2-2.rst").is_file()
+    assert "   mymodule/index\n" in (docs / "modules.rst").read_text()
+    assert "   ../base\n" in (docs / "mymodule/index-toc/2-1.rst").read_text()
+
+    check = api.run(dataclasses.replace(config, check=True)).check
+    assert check is not None
+    assert not check
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from sphinx_nested_apidoc import archive, core
+
+
+@pytest.fixture
+def package_dir(tmp_path: Path) -> Path:
+    package = tmp_path / "mymodule"
+    (package / "fruits").mkdir(parents=True)
+    for name in (
+        "__init__.py",
+        "base.py",
+        "fruits/__init__.py",
+        "fruits/mango.py",
+    ):
+        (package / name).touch()
+    return package
+
+
+EXPECTED_NAMES = [
+    "modules.rst",
+    "mymodule/base.rst",
+    "mymodule/fruits/index.rst",
+    "mymodule/fruits/mango.rst",
+    "mymodule/index.rst",
+]
+
+
+@pytest.mark.parametrize(
+    "suffix",
+    [".tar", ".tar.gz", ".tar.xz", ".tar.zst", ".zip"],
+)
+def test_write_archive_is_reproducible(
+    tmp_path: Path,
+    package_dir: Path,
+    suffix: str,
+):
+    if suffix == ".tar.zst":
+        pytest.importorskip("zstandard")
+    digests = set()
+    for run in range(2):
+        archive_path = tmp_path / f"out{run}{suffix}"
+        archive.write_archive(archive_path, package_dir)
+        digests.add(hashlib.sha256(archive_path.read_bytes()).hexdigest())
+    assert len(digests) == 1
+
+
+def test_write_archive_tar_entries(tmp_path: Path, package_dir: Path):
+    archive_path = tmp_path / "out.tar.gz"
+    archive.write_archive(archive_path, package_dir)
+
+    with tarfile.open(archive_path) as tar:
+        members = tar.getmembers()
+    assert sorted(member.name for member in members) == EXPECTED_NAMES
+    assert {member.mtime for member in members} == {archive._FIXED_MTIME}
+    # nothing is written next to the package or the archive.
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "mymodule",
+        "out.tar.gz",
+    ]
+
+
+def test_write_archive_zip_entries(tmp_path: Path, package_dir: Path):
+    archive_path = tmp_path / "out.zip"
+    archive.write_archive(
+        archive_path,
+        package_dir,
+        package_name=Path("src"),
+    )
+
+    with zipfile.ZipFile(archive_path) as zf:
+        infos = zf.infolist()
+    assert sorted(info.filename for info in infos) == [
+        name.replace("mymodule/", "src/", 1) for name in EXPECTED_NAMES
+    ]
+    assert {info.date_time for info in infos} == {archive._FIXED_DATE_TIME}
+
+
+def test_write_archive_zst_entries(tmp_path: Path, package_dir: Path):
+    zstandard = pytest.importorskip("zstandard")
+    archive_path = tmp_path / "out.tar.zst"
+    archive.write_archive(archive_path, package_dir)
+
+    data = zstandard.ZstdDecompressor().decompress(
+        archive_path.read_bytes(),
+        max_output_size=1 << 20,
+    )
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        names = sorted(tar.getnames())
+    assert names == EXPECTED_NAMES
+
+
+def test_write_archive_failure_keeps_previous_archive(
+    tmp_path: Path,
+    package_dir: Path,
+    mocker: MockerFixture,
+):
+    archive_path = tmp_path / "out.tar.gz"
+    archive_path.write_bytes(b"previous")
+
+    def render(module_path: str, sink, *args, **kwargs):
+        sink(Path("mymodule.rst"), "mymodule\n")
+        raise RuntimeError("apidoc failed")
+
+    mocker.patch.object(core, "render_sphinx_apidoc", render)
+    with pytest.raises(RuntimeError, match="apidoc failed"):
+        archive.write_archive(archive_path, package_dir)
+
+    # neither a truncated archive nor the temporary file is left behind.
+    assert archive_path.read_bytes() == b"previous"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "mymodule",
+        "out.tar.gz",
+    ]
+
+
+def test_write_archive_dry_run(tmp_path: Path, package_dir: Path):
+    archive_path = tmp_path / "out.tar"
+    archive.write_archive(archive_path, package_dir, dry_run=True)
+    assert not archive_path.exists()
+
+
+def test_get_archive_format():
+    assert archive.get_archive_format(Path("a.TAR.GZ")) == "gz"
+    assert archive.get_archive_format(Path("a.tar")) == ""
+    assert archive.get_archive_format(Path("a.zip")) is None
+    with pytest.raises(ValueError, match="unsupported archive format"):
+        archive.get_archive_format(Path("a.rar"))
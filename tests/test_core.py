@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import os
+import pathlib
+import tempfile
+import tracemalloc
+import types
 from pathlib import Path
 
+import jinja2
 from hypothesis import given
 from pytest_mock import MockerFixture
 
@@ -114,3 +119,280 @@ class TestFeedSphinxApidocFunc:
             )
 
     # TODO: check working of _add_flag_if_not_present
+
+
+class TestRenameFilesFunc:
+    FS_CALLS = (
+        "stat",
+        "lstat",
+        "scandir",
+        "mkdir",
+        "open",
+        "link",
+        "rename",
+        "replace",
+        "unlink",
+    )
+
+    @staticmethod
+    def make_package(root: Path, subpackages: int, modules: int) -> Path:
+        package = root / "mymodule"
+        package.mkdir()
+        (package / "__init__.py").touch()
+        for i in range(subpackages):
+            subpackage = package / f"sub{i}"
+            subpackage.mkdir()
+            (subpackage / "__init__.py").touch()
+            for j in range(modules):
+                (subpackage / f"mod{j}.py").touch()
+        return package
+
+    def count_fs_calls(self, monkeypatch, func, *args, **kwargs) -> int:
+        calls = 0
+
+        def counting(fn):
+            def wrapper(*a, **kw):
+                nonlocal calls
+                calls += 1
+                return fn(*a, **kw)
+
+            return wrapper
+
+        with monkeypatch.context() as m:
+            for name in self.FS_CALLS:
+                m.setattr(os, name, counting(getattr(os, name)))
+            # before Python 3.11, pathlib binds the `os` functions to its
+            # accessor when it is imported, so they are counted there too.
+            accessor = getattr(pathlib, "_NormalAccessor", None)
+            for name, fn in vars(accessor or object).items():
+                if name in (*self.FS_CALLS, "link_to") and isinstance(
+                    fn, types.BuiltinFunctionType
+                ):
+                    m.setattr(accessor, name, staticmethod(counting(fn)))
+            func(*args, **kwargs)
+        return calls
+
+    def test_fs_calls_per_page(self, tmp_path: Path, monkeypatch):
+        package = self.make_package(tmp_path, subpackages=5, modules=10)
+        docs = tmp_path / "docs"
+        core.feed_sphinx_apidoc(str(docs), str(package))
+        pages = len(list(docs.iterdir())) - 1  # `modules.rst` is excluded
+
+        calls = self.count_fs_calls(
+            monkeypatch, core.rename_files, docs, package
+        )
+
+        assert (docs / "mymodule" / "sub4" / "mod9.rst").is_file()
+        assert sorted(p.name for p in docs.iterdir()) == [
+            "modules.rst",
+            "mymodule",
+        ]
+        # one stat, link and unlink per page, and a few calls per directory.
+        directories = 5 + 2
+        assert calls <= 3 * pages + 3 * directories
+
+    def test_existing_files_are_not_replaced(self, tmp_path: Path):
+        package = self.make_package(tmp_path, subpackages=1, modules=1)
+        docs = tmp_path / "docs"
+        core.feed_sphinx_apidoc(str(docs), str(package))
+        dest = docs / "mymodule" / "sub0" / "mod0.rst"
+        dest.parent.mkdir(parents=True)
+        dest.write_text("existing")
+
+        core.rename_files(docs, package)
+        assert dest.read_text() == "existing"
+        assert not (docs / "mymodule.sub0.mod0.rst").exists()
+
+        core.feed_sphinx_apidoc(str(docs), str(package))
+        core.rename_files(docs, package, force=True)
+        assert dest.read_text() != "existing"
+
+
+class TestWriteNestedFilesFunc:
+    def test_matches_rename_files(self, tmp_path: Path):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=2, modules=2
+        )
+        renamed = tmp_path / "renamed"
+        streamed = tmp_path / "streamed"
+
+        core.feed_sphinx_apidoc(str(renamed), str(package))
+        core.rename_files(renamed, package)
+        core.write_nested_files(streamed, package)
+
+        def read_tree(root: Path) -> dict[str, str]:
+            return {
+                p.relative_to(root).as_posix(): p.read_text()
+                for p in root.rglob("*")
+                if p.is_file()
+            }
+
+        assert read_tree(streamed) == read_tree(renamed)
+
+    def test_memory_is_bounded(self, tmp_path: Path, monkeypatch):
+        subpackages, modules = 100, 100
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=subpackages, modules=modules
+        )
+        # pathlib interns every path component on older Pythons. The intern
+        # table is resized as the unique page names come and go, but it is
+        # not holding on to them.
+        not_interned = tracemalloc.Filter(False, pathlib.__file__)
+
+        # retained memory is compared after the 10th and the last package.
+        # Only the totals are kept, since snapshots are traced themselves.
+        retained = []
+        calls = 0
+        page_destination = core._page_destination
+
+        def snapshot_page_destination(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls in (modules * 10, modules * subpackages):
+                snapshot = tracemalloc.take_snapshot()
+                retained.append(
+                    sum(
+                        stat.size
+                        for stat in snapshot.filter_traces(
+                            [not_interned]
+                        ).statistics("filename")
+                    )
+                )
+            return page_destination(*args, **kwargs)
+
+        monkeypatch.setattr(
+            core, "_page_destination", snapshot_page_destination
+        )
+
+        tracemalloc.start()
+        try:
+            core.write_nested_files(tmp_path / "docs", package)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert (tmp_path / "docs/mymodule/sub99/mod99.rst").is_file()
+        assert (tmp_path / "docs/mymodule/sub99/index.rst").is_file()
+        # keeping anything per page would retain a few MiB for 9k pages.
+        first, last = retained
+        assert last - first < 256 * 1024
+        assert peak < 8 * 1024 * 1024
+
+
+class TestCheckNestedFilesFunc:
+    def test_no_drift(self, tmp_path: Path):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=2, modules=2
+        )
+        docs = tmp_path / "docs"
+        core.feed_sphinx_apidoc(str(docs), str(package))
+        core.rename_files(docs, package)
+
+        assert not core.check_nested_files(docs, package)
+
+    def test_drift(self, tmp_path: Path):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=2, modules=2
+        )
+        docs = tmp_path / "docs"
+        core.write_nested_files(docs, package)
+        (docs / "mymodule/sub0/mod0.rst").write_text("changed")
+        (docs / "mymodule/sub1/mod1.rst").unlink()
+        (docs / "mymodule/sub1/old.rst").touch()
+        (docs / "mymodule/sub1/notes.txt").touch()
+        (docs / "conf.rst").touch()
+
+        result = core.check_nested_files(docs, package)
+        assert result
+        assert result.added == [Path("mymodule/sub1/mod1.rst")]
+        assert result.changed == [Path("mymodule/sub0/mod0.rst")]
+        assert result.orphaned == [Path("mymodule/sub1/old.rst")]
+
+    def test_nested_package_name(self, tmp_path: Path):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=1, modules=1
+        )
+        docs = tmp_path / "docs"
+        package_name = Path("api/mymodule")
+        core.write_nested_files(docs, package, package_name=package_name)
+        # hand-written pages next to the nested directory are not ours.
+        (docs / "api/overview.rst").touch()
+        (docs / "api/mymodule/old.rst").touch()
+
+        result = core.check_nested_files(
+            docs, package, package_name=package_name
+        )
+        assert result.orphaned == [Path("api/mymodule/old.rst")]
+        assert not result.added
+        assert not result.changed
+
+    def test_does_not_write(self, tmp_path: Path):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=1, modules=1
+        )
+        docs = tmp_path / "docs"
+
+        result = core.check_nested_files(docs, package, package_name=Path("x"))
+        assert not docs.exists()
+        assert Path("x/sub0/mod0.rst") in result.added
+        assert Path("modules.rst") in result.added
+
+
+class TestRenderSphinxApidocFunc:
+    def test_renderers_are_reused(
+        self, tmp_path: Path, mocker: MockerFixture, monkeypatch
+    ):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=3, modules=3
+        )
+        monkeypatch.setattr(core, "_renderers", {})
+        renderer_class = mocker.spy(
+            core._apidoc_generator_module(), "ReSTRenderer"
+        )
+
+        pages: list[Path] = []
+        for _ in range(2):
+            core.render_sphinx_apidoc(
+                str(package),
+                lambda name, _: pages.append(name),
+                template_cache_dir=tmp_path / "cache",
+            )
+
+        assert len(pages) == 2 * 14
+        assert renderer_class.call_count == 1
+
+    def test_no_cache_dir_writes_nothing(self, tmp_path: Path, monkeypatch):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=1, modules=1
+        )
+        tmp = tmp_path / "tmp"
+        tmp.mkdir()
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp))
+        monkeypatch.setattr(core, "_renderers", {})
+        core.check_nested_files(tmp_path / "docs", package)
+        assert not any(tmp.iterdir())
+
+    def test_compiled_templates_are_cached(
+        self, tmp_path: Path, mocker: MockerFixture, monkeypatch
+    ):
+        package = TestRenameFilesFunc.make_package(
+            tmp_path, subpackages=1, modules=1
+        )
+        cache_dir = tmp_path / "cache"
+        monkeypatch.setattr(core, "_renderers", {})
+        core.render_sphinx_apidoc(
+            str(package),
+            lambda *_: None,
+            template_cache_dir=cache_dir,
+        )
+        assert any(cache_dir.iterdir())
+
+        # a fresh renderer, as in a new process, loads the compiled templates.
+        monkeypatch.setattr(core, "_renderers", {})
+        compile_ = mocker.spy(jinja2.Environment, "compile")
+        core.render_sphinx_apidoc(
+            str(package),
+            lambda *_: None,
+            template_cache_dir=cache_dir,
+        )
+        compile_.assert_not_called()
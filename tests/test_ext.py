@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+from sphinx.errors import ExtensionError
+
+from sphinx_nested_apidoc import _ext, core
+from sphinx_nested_apidoc.toctree import ToctreeOptions
+
+
+@pytest.fixture
+def package_dir(tmp_path: Path) -> Path:
+    package = tmp_path / "mymodule"
+    package.mkdir()
+    for name in ("__init__.py", "base.py"):
+        (package / name).touch()
+    return package
+
+
+def test_execute(tmp_path: Path, package_dir: Path):
+    docs = tmp_path / "docs"
+    _ext._execute(
+        package_dir,
+        docs,
+        None,
+        "rst",
+        ("index", "modules"),
+        False,
+        False,
+    )
+    assert (docs / "mymodule" / "base.rst").is_file()
+    assert (docs / "index.rst").is_file()
+    assert (docs / "conf.py").is_file()
+
+
+def test_execute_toctree(tmp_path: Path, package_dir: Path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "index.rst").write_text(".. toctree::\n\n   mymodule\n")
+    _ext._execute(
+        package_dir,
+        docs,
+        None,
+        "rst",
+        ("index", "modules"),
+        False,
+        False,
+        toctree=ToctreeOptions(maxdepth=2),
+    )
+    # the existing root page is kept as it is.
+    assert (docs / "index.rst").read_text() == ".. toctree::\n\n   mymodule\n"
+    assert (docs / "conf.py").is_file()
+    assert ":maxdepth: 2" in (docs / "mymodule/index.rst").read_text()
+
+    (docs / "index.rst").unlink()
+    _ext._execute(
+        package_dir,
+        docs,
+        None,
+        "rst",
+        ("index", "modules"),
+        False,
+        False,
+        toctree=ToctreeOptions(maxdepth=2),
+    )
+    assert "   mymodule/index\n" in (docs / "index.rst").read_text()
+
+
+def test_builder_inited_remap(
+    tmp_path: Path,
+    package_dir: Path,
+    mocker: MockerFixture,
+):
+    docs = tmp_path / "docs"
+    app = mocker.Mock(srcdir=docs)
+    _ext.setup(app)
+    app.config = SimpleNamespace(
+        **{
+            call.args[0]: call.args[1]
+            for call in app.add_config_value.call_args_list
+        }
+    )
+    app.config.sphinx_nested_apidoc_package_dir = str(package_dir)
+    app.config.sphinx_nested_apidoc_remap = True
+    _ext._builder_inited(app)
+    assert (docs / "mymodule/base.rst").is_file()
+
+    apidoc_main = mocker.spy(core.apidoc, "main")
+    app.config.sphinx_nested_apidoc_package_name = "src"
+    _ext._builder_inited(app)
+
+    apidoc_main.assert_not_called()
+    assert (docs / "src/base.rst").is_file()
+    assert not (docs / "mymodule").exists()
+
+
+def test_execute_failed(
+    tmp_path: Path,
+    package_dir: Path,
+    mocker: MockerFixture,
+):
+    mocker.patch.object(
+        core,
+        "_move_file",
+        side_effect=PermissionError("denied"),
+    )
+    with pytest.raises(ExtensionError, match="base.rst"):
+        _ext._execute(
+            package_dir,
+            tmp_path / "docs",
+            None,
+            "rst",
+            ("index", "modules"),
+            False,
+            False,
+        )
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from sphinx_nested_apidoc.toctree import (
+    ToctreeOptions,
+    move_toctree_entries,
+    rewrite_toctrees,
+)
+
+PACKAGE_PAGE = """\
+pkg package
+===========
+
+Subpackages
+-----------
+
+.. toctree::
+   :maxdepth: 4
+
+   pkg.sub
+
+Submodules
+----------
+
+.. toctree::
+   :maxdepth: 4
+
+   pkg.a
+   pkg.b
+   pkg.c
+
+Module contents
+---------------
+"""
+
+NESTED = {
+    "pkg": Path("pkg/index.rst"),
+    "pkg.sub": Path("pkg/sub/index.rst"),
+    "pkg.a": Path("pkg/a.rst"),
+    "pkg.b": Path("pkg/b.rst"),
+    "pkg.c": Path("pkg/c.rst"),
+}
+
+
+def rewrite(
+    text: str,
+    options: ToctreeOptions,
+    page: Path = Path("pkg/index.rst"),
+) -> tuple[str, list[tuple[Path, str]]]:
+    return rewrite_toctrees(text, page, NESTED.__getitem__, options)
+
+
+def toctree_entries(text: str) -> list[str]:
+    return [
+        line.strip()
+        for line in text.splitlines()
+        if line.startswith("   ") and not line.strip().startswith(":")
+    ]
+
+
+def test_entries_are_relative_to_page():
+    text, child_pages = rewrite(PACKAGE_PAGE, ToctreeOptions())
+    assert toctree_entries(text) == ["sub/index", "a", "b", "c"]
+    assert text.count(":maxdepth: 4") == 2
+    assert text.endswith("Module contents\n---------------\n")
+    assert not child_pages
+
+    text, _ = rewrite(
+        ".. toctree::\n\n   Package <pkg>\n",
+        ToctreeOptions(),
+        page=Path("modules.rst"),
+    )
+    assert toctree_entries(text) == ["Package <pkg/index>"]
+
+
+def test_maxdepth():
+    text, _ = rewrite(PACKAGE_PAGE, ToctreeOptions(maxdepth=1))
+    assert ":maxdepth: 4" not in text
+    assert text.count(":maxdepth: 1") == 2
+
+
+def test_glob():
+    text, _ = rewrite(PACKAGE_PAGE, ToctreeOptions(glob=True))
+    assert toctree_entries(text) == ["*/index", "*"]
+    assert text.count(":glob:") == 2
+
+    # everything at the top level would match the patterns.
+    text, _ = rewrite(
+        ".. toctree::\n\n   pkg\n",
+        ToctreeOptions(glob=True),
+        page=Path("modules.rst"),
+    )
+    assert toctree_entries(text) == ["pkg/index"]
+
+
+def test_max_entries():
+    text, child_pages = rewrite(PACKAGE_PAGE, ToctreeOptions(max_entries=2))
+    assert toctree_entries(text) == [
+        "sub/index",
+        "index-toc/2-1",
+        "index-toc/2-2",
+    ]
+    assert [(name, toctree_entries(page)) for name, page in child_pages] == [
+        (Path("pkg/index-toc/2-1.rst"), ["../a", "../b"]),
+        (Path("pkg/index-toc/2-2.rst"), ["../c"]),
+    ]
+    assert child_pages[0][1].startswith("pkg.a - pkg.b\n=============\n")
+
+
+def test_unknown_entries_are_kept():
+    page = ".. toctree::\n   :hidden:\n\n   self\n   pkg.a\n"
+    text, _ = rewrite(page, ToctreeOptions(maxdepth=1))
+    assert text == page
+
+
+def test_move_toctree_entries():
+    text = """\
+.. toctree::
+   :maxdepth: 2
+
+   old/index
+   Base <old/base>
+   other/index
+   old
+"""
+    moved = move_toctree_entries(
+        text, Path("modules.rst"), Path("old"), Path("new/dir")
+    )
+    assert moved == text.replace("old/", "new/dir/")
+    moved = move_toctree_entries(
+        text.replace("old/", "../old/"),
+        Path("modules-toc/1-1.rst"),
+        Path("old"),
+        Path("new/dir"),
+    )
+    assert moved == text.replace("old/", "../new/dir/")
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"maxdepth": 0}, {"max_entries": 0}],
+)
+def test_invalid_options(options: dict[str, int]):
+    with pytest.raises(ValueError, match="at least 1"):
+        ToctreeOptions(**options)